@@ -2,188 +2,55 @@
 """
 自动生成Executive Summary报告
 从分析结果中提取关键指标并填充到report.md
+
+用法:
+    python3 generate_report.py                      # 生成 report.md / index.html (同 render)
+    python3 generate_report.py render --charts      # 同时生成图表
+    python3 generate_report.py render --interactive # index.html 为交互式页面 (内嵌汇总数据, 不需要PNG)
+    python3 generate_report.py baseline --timing    # 只看基线, 并打印各阶段耗时
+    python3 generate_report.py trend | segments | scenarios | charts
+    python3 generate_report.py --metrics metrics.jsonl  # 各阶段耗时/CPU/峰值RSS/行数, 每行一个JSON
+
+pandas/statsmodels/matplotlib 都在子命令真正需要时才导入
 """
 
-import pandas as pd
-import numpy as np
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import sys
 from datetime import datetime
-from scipy import stats
-from statsmodels.stats.proportion import proportions_ztest
-from statsmodels.api import Logit
+from lead_quality import instrument
+from lead_quality.cache import CACHE_DIR, ResultCache
+from lead_quality.pipeline import Pipeline
+from lead_quality.store import STORE_PATH
 import warnings
 warnings.filterwarnings('ignore')
 
-def load_data():
-    """加载清洗后的数据"""
+def load_pipeline(use_cache=True, **params):
+    """建立分析流水线 (数据延迟加载); use_cache时节点结果读写磁盘缓存"""
     try:
-        df = pd.read_pickle('df_cleaned.pkl')
-        return df
+        return Pipeline.load(cache=ResultCache() if use_cache else None, **params)
     except FileNotFoundError:
-        print("错误: 找不到 df_cleaned.pkl")
+        print(f"错误: 找不到 {STORE_PATH}")
         print("请先运行 01_load_and_clean.ipynb")
         return None
 
-def calculate_baseline(df):
-    """计算基线指标"""
-    all_leads = len(df)
-    good_quality_count = df['is_good'].sum()
-    closed_count = df['is_closed'].sum()
-    bad_count = df['is_bad'].sum()
-    
-    GoodQualityRate = good_quality_count / all_leads
-    CloseRate = closed_count / all_leads
-    BadRate = bad_count / all_leads
-    
-    return {
-        'all_leads': all_leads,
-        'GoodQualityRate': GoodQualityRate,
-        'CloseRate': CloseRate,
-        'BadRate': BadRate,
-        'good_count': good_quality_count,
-        'closed_count': closed_count,
-        'bad_count': bad_count
-    }
-
-def analyze_trend(df):
-    """分析趋势"""
-    df_sorted = df.sort_values('date').reset_index(drop=True)
-    mid_point = len(df_sorted) // 2
-    
-    first_half = df_sorted.iloc[:mid_point]
-    second_half = df_sorted.iloc[mid_point:]
-    
-    rate_first = first_half['is_good'].mean()
-    rate_second = second_half['is_good'].mean()
-    n_first = len(first_half)
-    n_second = len(second_half)
-    count_first = first_half['is_good'].sum()
-    count_second = second_half['is_good'].sum()
-    
-    # z-test
-    counts = np.array([count_first, count_second])
-    nobs = np.array([n_first, n_second])
-    z_stat, p_value = proportions_ztest(counts, nobs)
-    
-    # Logistic regression
-    X = df_sorted[['day_index']].values
-    y = df_sorted['is_good'].values
-    logit_model = Logit(y, X)
-    logit_result = logit_model.fit(disp=0)
-    coef = logit_result.params[0]
-    p_value_coef = logit_result.pvalues[0]
-    
-    return {
-        'overall_rate': df['is_good'].mean(),
-        'first_half_rate': rate_first,
-        'second_half_rate': rate_second,
-        'change_direction': '改善' if rate_second > rate_first else '下降' if rate_second < rate_first else '无明显变化',
-        'change_magnitude': abs(rate_second - rate_first),
-        'change_pct': abs((rate_second - rate_first)/rate_first*100) if rate_first > 0 else 0,
-        'p_value_ztest': p_value,
-        'p_value_logistic': p_value_coef,
-        'significant': p_value < 0.05 or p_value_coef < 0.05,
-        'trend_coef': coef
-    }
-
-def find_top_segments(df, baseline_rate):
-    """找出Top高质量和低质量段"""
-    def segment_analysis(df, segment_col, baseline_rate):
-        results = []
-        for segment in df[segment_col].unique():
-            if pd.isna(segment):
-                segment_df = df[df[segment_col].isna()]
-                segment_name = 'missing'
-            else:
-                segment_df = df[df[segment_col] == segment]
-                segment_name = str(segment)
-            
-            if len(segment_df) == 0:
-                continue
-            
-            n = len(segment_df)
-            good_count = segment_df['is_good'].sum()
-            good_rate = good_count / n
-            lift = good_rate / baseline_rate if baseline_rate > 0 else 0
-            
-            if n >= 50:  # 只考虑样本量足够的
-                results.append({
-                    'dimension': segment_col,
-                    'segment': segment_name,
-                    'rate': good_rate,
-                    'lift': lift,
-                    'leads': n
-                })
-        
-        return results
-    
-    all_segments = []
-    dimensions = ['dc_pages', 'publisher_zone', 'is_call_center', 'address_score_bin', 
-                  'phone_score_bin', 'is_branded', 'traffic_type', 'design', 'bg_color']
-    
-    for dim in dimensions:
-        if dim in df.columns:
-            segments = segment_analysis(df, dim, baseline_rate)
-            all_segments.extend(segments)
-    
-    segments_df = pd.DataFrame(all_segments)
-    if len(segments_df) == 0:
-        return [], []
-    
-    high_quality = segments_df.nlargest(5, 'rate')
-    low_quality = segments_df.nsmallest(5, 'rate')
-    
-    return high_quality.to_dict('records'), low_quality.to_dict('records')
+def scenario_reach(uncertainty, name):
+    """情景的bootstrap结果 (scenario_uncertainty 节点中的一行), 没有时为 None"""
+    if uncertainty is None:
+        return None
+    rows = uncertainty[uncertainty['scenario'] == name]
+    return rows.iloc[0] if len(rows) else None
 
-def analyze_uplift_scenarios(df, baseline_rate, target_rate=0.096):
-    """分析uplift情景"""
-    scenarios = []
-    
-    # Scenario A: 砍尾巴
-    df_sorted = df.sort_values('is_good').reset_index(drop=True)
-    for cut_pct in [5, 10, 15, 20]:
-        cut_n = int(len(df_sorted) * cut_pct / 100)
-        df_remaining = df_sorted.iloc[cut_n:]
-        new_rate = df_remaining['is_good'].mean()
-        scenarios.append({
-            'name': f'Scenario A: 砍掉最差{cut_pct}%流量',
-            'new_rate': new_rate,
-            'reached_target': new_rate >= target_rate,
-            'volume_drop': cut_pct
-        })
-    
-    # Scenario C: Score Gating
-    address_score_col = None
-    phone_score_col = None
-    for col in df.columns:
-        if 'address' in col.lower() and 'score' in col.lower() and 'bin' not in col.lower():
-            address_score_col = col
-        if 'phone' in col.lower() and 'score' in col.lower() and 'bin' not in col.lower():
-            phone_score_col = col
-    
-    if phone_score_col:
-        df_filtered = df[df[phone_score_col] >= 4]
-        if len(df_filtered) > 0:
-            scenarios.append({
-                'name': 'Scenario C: PhoneScore >= 4',
-                'new_rate': df_filtered['is_good'].mean(),
-                'reached_target': df_filtered['is_good'].mean() >= target_rate,
-                'volume_drop': (len(df) - len(df_filtered)) / len(df) * 100
-            })
-    
-    if address_score_col:
-        df_filtered = df[df[address_score_col] >= 4]
-        if len(df_filtered) > 0:
-            scenarios.append({
-                'name': 'Scenario C: AddressScore >= 4',
-                'new_rate': df_filtered['is_good'].mean(),
-                'reached_target': df_filtered['is_good'].mean() >= target_rate,
-                'volume_drop': (len(df) - len(df_filtered)) / len(df) * 100
-            })
-    
-    return scenarios
+def reach_text(row):
+    return (f"{row['p_reach_target']*100:.1f}% (bootstrap {int(row['replicates']):,}次, "
+            f"新质量95%区间 {row['rate_ci_lower']*100:.2f}% – {row['rate_ci_upper']*100:.2f}%)")
 
-def generate_html_report(baseline, trend, high_segments, low_segments, scenarios, best_scenario):
-    """生成HTML格式的报告"""
+@instrument.instrumented('render_html', kind='render')
+def generate_html_report(baseline, trend, high_segments, low_segments, scenarios, best_scenario, uncertainty=None):
+    """生成HTML格式的报告; uncertainty 为 scenario_uncertainty 节点的结果"""
     
     # 计算best_rate
     target_rate = 0.096
@@ -220,13 +87,15 @@ def generate_html_report(baseline, trend, high_segments, low_segments, scenarios
     scenarios_html = ""
     for s in scenarios[:3]:
         status_icon = "✅" if s['reached_target'] else "❌"
+        reach = scenario_reach(uncertainty, s['name'])
+        reach_html = f"\n                <li>达标概率: <strong>{reach_text(reach)}</strong></li>" if reach is not None else ""
         scenarios_html += f"""
         <div class="scenario-box">
             <h4>{s['name']}</h4>
             <ul>
                 <li>新质量: <strong>{s['new_rate']:.4f} ({s['new_rate']*100:.2f}%)</strong></li>
                 <li>Volume影响: 下降 <strong>{s['volume_drop']:.1f}%</strong></li>
-                <li>结果: {status_icon} {'达到目标' if s['reached_target'] else '未达到目标'}</li>
+                <li>结果: {status_icon} {'达到目标' if s['reached_target'] else '未达到目标'}</li>{reach_html}
             </ul>
         </div>
         """
@@ -554,37 +423,35 @@ def generate_html_report(baseline, trend, high_segments, low_segments, scenarios
 """
     return html_template
 
-def generate_report():
-    """生成报告"""
+def generate_report(pipeline=None, charts=False, use_cache=True, interactive=False):
+    """生成报告; charts为True时用同一条流水线生成图表, interactive为True时 index.html 为交互式页面"""
     print("=" * 60)
     print("生成Executive Summary报告")
     print("=" * 60)
     
     # 加载数据
-    df = load_data()
-    if df is None:
+    if pipeline is None:
+        pipeline = load_pipeline(use_cache)
+    if pipeline is None:
         return
     
     # 计算基线
-    baseline = calculate_baseline(df)
+    baseline = pipeline['baseline']
     print(f"\n基线GoodQualityRate: {baseline['GoodQualityRate']:.4f} ({baseline['GoodQualityRate']*100:.2f}%)")
     
     # 趋势分析
-    trend = analyze_trend(df)
+    trend = pipeline['trend']
     print(f"趋势: {trend['change_direction']}, p={trend['p_value_ztest']:.4f}")
     
     # 驱动因素
-    high_segments, low_segments = find_top_segments(df, baseline['GoodQualityRate'])
+    high_segments, low_segments = pipeline['top_segments']
     print(f"找到 {len(high_segments)} 个高质量段, {len(low_segments)} 个低质量段")
     
     # Uplift分析
-    scenarios = analyze_uplift_scenarios(df, baseline['GoodQualityRate'])
-    best_scenario = None
-    best_rate = baseline['GoodQualityRate']
-    for s in scenarios:
-        if s['reached_target'] and s['new_rate'] > best_rate:
-            best_rate = s['new_rate']
-            best_scenario = s
+    scenarios = pipeline['scenarios']
+    best_scenario = pipeline['best_scenario']
+    best_rate = best_scenario['new_rate'] if best_scenario else baseline['GoodQualityRate']
+    uncertainty = pipeline['scenario_uncertainty']
     
     # 生成报告内容
     report_content = f"""# Lead Quality Analysis - Executive Summary
@@ -664,7 +531,11 @@ def generate_report():
         report_content += f"**{s['name']}**\n"
         report_content += f"- 新质量: {s['new_rate']:.4f} ({s['new_rate']*100:.2f}%)\n"
         report_content += f"- Volume影响: 下降 {s['volume_drop']:.1f}%\n"
-        report_content += f"- {'✓ 达到目标' if s['reached_target'] else '✗ 未达到目标'}\n\n"
+        report_content += f"- {'✓ 达到目标' if s['reached_target'] else '✗ 未达到目标'}\n"
+        reach = scenario_reach(uncertainty, s['name'])
+        if reach is not None:
+            report_content += f"- 达标概率: {reach_text(reach)}\n"
+        report_content += "\n"
     
     report_content += "### 最终结论\n\n"
     
@@ -705,18 +576,218 @@ def generate_report():
         f.write(report_content)
     
     # 生成HTML报告
-    html_content = generate_html_report(baseline, trend, high_segments, low_segments, scenarios, best_scenario)
-    with open('index.html', 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    if interactive:
+        from lead_quality.interactive import write_interactive_report
+        html_size = write_interactive_report(pipeline, 'index.html')
+    else:
+        html_content = generate_html_report(baseline, trend, high_segments, low_segments, scenarios, best_scenario,
+                                            uncertainty)
+        with open('index.html', 'w', encoding='utf-8') as f:
+            f.write(html_content)
     
     print(f"\n✓ 报告已生成:")
     print(f"  - report.md (Markdown格式)")
-    print(f"  - index.html (HTML格式，可在浏览器中打开)")
+    if interactive:
+        print(f"  - index.html (交互式HTML, 内嵌汇总数据, {html_size / 1024:.0f} KB, 离线可用)")
+    else:
+        print(f"  - index.html (HTML格式，可在浏览器中打开)")
     print(f"\n关键结果:")
     print(f"  - Baseline: {baseline['GoodQualityRate']*100:.2f}%")
     print(f"  - 趋势: {trend['change_direction']} ({'显著' if trend['significant'] else '不显著'})")
     print(f"  - 能否达到9.6%: {'能' if best_scenario else '不能'}")
     print(f"\n打开HTML报告: open index.html")
+    if pipeline.cache is not None:
+        print(f"结果缓存 ({pipeline.cache.path}): 命中 {pipeline.cache.hits}, 重新计算 {pipeline.cache.misses}")
+    
+    if charts:
+        from generate_visualizations import render_all
+        render_all(pipeline)
+
+class PhaseTimer:
+    """记录各阶段耗时 (从脚本开始执行算起, 不含解释器自身启动)"""
+
+    def __init__(self):
+        self.phases = []
+        self._last = _START
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self, pipeline=None):
+        print("\n耗时:")
+        for name, seconds in self.phases:
+            print(f"  {name:<12} {seconds * 1000:8.1f} ms")
+        print(f"  {'合计':<12} {(self._last - _START) * 1000:8.1f} ms")
+        if pipeline is not None and pipeline.timings:
+            print("节点 (含依赖节点):")
+            for name, (seconds, source) in pipeline.timings.items():
+                print(f"  {name:<14} {seconds * 1000:8.1f} ms  {source}")
+        heavy = [name for name in ['numpy', 'pandas', 'pyarrow', 'scipy', 'statsmodels', 'matplotlib']
+                 if name in sys.modules]
+        print(f"已导入的重模块: {', '.join(heavy) if heavy else '无'}")
+
+def print_baseline(pipeline):
+    baseline = pipeline['baseline']
+    print(f"Leads: {baseline['all_leads']:,}")
+    for metric in ['GoodQualityRate', 'CloseRate', 'BadRate']:
+        print(f"{metric}: {baseline[metric]:.4f} ({baseline[metric]*100:.2f}%)")
+
+def print_trend(pipeline):
+    trend = pipeline['trend']
+    print(f"趋势: {trend['change_direction']} ({'显著' if trend['significant'] else '不显著'})")
+    print(f"前1/2: {trend['first_half_rate']:.4f}, 后1/2: {trend['second_half_rate']:.4f}")
+    print(f"z检验 p = {trend['p_value_ztest']:.4f}, logistic p = {trend['p_value_logistic']:.4f}, "
+          f"Cochran-Armitage p = {trend['p_value_cochran_armitage']:.4f}")
+    print(f"变点: {trend['change_point_date']} ({trend['change_point_rate_before']:.4f} -> "
+          f"{trend['change_point_rate_after']:.4f}), p = {trend['p_value_change_point']:.4f}")
+
+def print_segments(pipeline, args):
+    if args.by or args.where:
+        print_segment_drilldown(pipeline, args)
+        return
+    high_segments, low_segments = pipeline['top_segments']
+    for title, segments in [('高质量段', high_segments), ('低质量段', low_segments)]:
+        print(f"{title}:")
+        for seg in segments:
+            print(f"  {seg['dimension']}={seg['segment']}: {seg['rate']:.4f} ({seg['lift']:.2f}x, n={seg['leads']})")
+
+def _parse_filters(where):
+    """['维度=取值1,取值2', ...] -> {维度: [取值, ...]}"""
+    filters = {}
+    for item in where:
+        dim, _, values = item.partition('=')
+        filters.setdefault(dim.strip(), []).extend(value.strip() for value in values.split(','))
+    return filters
+
+def print_segment_drilldown(pipeline, args):
+    """任意维度组合的分群表, 从分群立方体汇总, 不扫描原始数据"""
+    cube = pipeline['segment_cube']
+    filters = _parse_filters(args.where)
+    by = [dim.strip() for dim in args.by.split(',')] if args.by else list(filters)
+    try:
+        if filters:
+            cube = cube.slice(**filters)
+        table = cube.segment_table(by, baseline_rate=pipeline['baseline']['GoodQualityRate'],
+                                   min_leads=args.min_leads)
+    except KeyError as e:
+        print(f"错误: {e.args[0]}")
+        return
+    table = table.sort_values('rate', ascending=False)
+    if args.top:
+        table = table.head(args.top)
+    where = ', '.join(f"{dim}={'|'.join(values)}" for dim, values in filters.items())
+    print(f"{' × '.join(by)}{f' ({where})' if where else ''}: {cube.all_total:,} leads, {len(table)} 个分群")
+    columns = by + ['leads', 'rate', 'lift', 'ci_lower', 'ci_upper', 'p_adjusted', 'significant']
+    print(table[columns].to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+
+def print_scenarios(pipeline):
+    for s in pipeline['scenarios']:
+        print(f"{s['name']}: {s['new_rate']:.4f}, volume -{s['volume_drop']:.1f}% "
+              f"{'✓' if s['reached_target'] else '✗'}")
+    best_scenario = pipeline['best_scenario']
+    print(f"最优方案: {best_scenario['name'] if best_scenario else '无 (达不到目标)'}")
+    uncertainty = pipeline['scenario_uncertainty']
+    print(f"\nbootstrap ({int(uncertainty['replicates'].max()):,}次) 达到 {pipeline.params['target_rate']:.1%} 的概率:")
+    for _, row in uncertainty.iterrows():
+        print(f"  {row['scenario']}: {row['new_rate']:.4f} [{row['rate_ci_lower']:.4f}, {row['rate_ci_upper']:.4f}], "
+              f"P = {row['p_reach_target']:.3f} [{row['p_reach_ci_lower']:.3f}, {row['p_reach_ci_upper']:.3f}]")
+
+def print_monitor(pipeline, args):
+    trends = pipeline['segment_trends']
+    if len(trends) == 0:
+        print("没有可监控的分群")
+        return
+    tested = trends[trends['p_value'].notna()]
+    flagged = tested if args.all else tested[tested['degrading'] | tested['improving']]
+    window_end = trends['window_end'].iloc[0]
+    print(f"截至 {window_end:%Y-%m-%d}: {len(trends)} 个分群, 检验 {len(tested)} 个, "
+          f"变差 {int(tested['degrading'].sum())} 个, 改善 {int(tested['improving'].sum())} 个")
+    # window_end 和 window_leads 之间是分群维度列
+    dimensions = trends.columns[1:trends.columns.get_loc('window_leads')]
+    for _, row in flagged.iterrows():
+        label = ' / '.join(str(row[dim]) for dim in dimensions)
+        status = '变差' if row['degrading'] else '改善' if row['improving'] else '-'
+        print(f"  {status} {label}: {row['baseline_rate']:.4f} -> {row['window_rate']:.4f} "
+              f"(n={int(row['window_leads'])}), q = {row['p_adjusted']:.4f}, "
+              f"斜率 {row['slope'] * 7:+.4f}/周, q = {row['slope_p_adjusted']:.4f}")
+
+def render_charts(pipeline, args):
+    from generate_visualizations import render_all
+    render_all(pipeline, dpi=args.dpi, fmt=args.format, jobs=args.jobs, force=args.force)
+
+COMMANDS = {
+    'render': lambda pipeline, args: generate_report(pipeline, charts=args.charts, interactive=args.interactive),
+    'baseline': lambda pipeline, args: print_baseline(pipeline),
+    'trend': lambda pipeline, args: print_trend(pipeline),
+    'segments': print_segments,
+    'scenarios': lambda pipeline, args: print_scenarios(pipeline),
+    'monitor': print_monitor,
+    'charts': render_charts,
+}
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--no-cache', action='store_true', help=f'不读写结果缓存 ({CACHE_DIR})')
+    common.add_argument('--timing', action='store_true', help='打印各阶段和各节点耗时')
+    common.add_argument('--metrics', default=None, help='各阶段的耗时/内存/行数写入这个JSON lines文件 (- 为标准错误)')
+    common.add_argument('--profile', default=None, help='各阶段的 cProfile 结果存到这个目录')
+
+    parser = argparse.ArgumentParser(description='生成Executive Summary报告')
+    subparsers = parser.add_subparsers(dest='command')
+    render = subparsers.add_parser('render', parents=[common], help='生成 report.md 和 index.html (默认)')
+    render.add_argument('--charts', action='store_true', help='同时生成图表 (与报告共用同一份计算结果)')
+    render.add_argument('--interactive', action='store_true',
+                        help='index.html 改为交互式页面: 内嵌汇总数据, 图表在浏览器中绘制, 表格可排序/筛选, 不需要PNG和网络')
+    subparsers.add_parser('baseline', parents=[common], help='基线指标')
+    subparsers.add_parser('trend', parents=[common], help='趋势检验')
+    segments = subparsers.add_parser('segments', parents=[common], help='Top高/低质量段, 或任意维度组合的分群表')
+    segments.add_argument('--by', default=None, help='按这些维度 (逗号分隔) 的组合汇总, 如 publisher_zone,traffic_type')
+    segments.add_argument('--where', action='append', default=[], help='只看 维度=取值 (多个取值用逗号), 可重复')
+    segments.add_argument('--min-leads', type=int, default=0, help='只列出至少这么多leads的分群 (默认 0)')
+    segments.add_argument('--top', type=int, default=None, help='只列出质量最高的前N个')
+    scenarios = subparsers.add_parser('scenarios', parents=[common], help='uplift情景和bootstrap达标概率')
+    scenarios.add_argument('--replicates', type=int, default=None, help='bootstrap重抽样次数 (默认 10000)')
+    monitor = subparsers.add_parser('monitor', parents=[common], help='各分群滚动窗口趋势扫描 (BH校正)')
+    monitor.add_argument('--window', type=int, default=None, help='最近窗口天数 (默认 7)')
+    monitor.add_argument('--baseline', type=int, default=None, help='对比的基线期天数 (默认 28)')
+    monitor.add_argument('--min-leads', type=int, default=None, help='窗口和基线期的最少leads (默认 20)')
+    monitor.add_argument('--all', action='store_true', help='列出所有检验过的分群, 不只是显著的')
+    charts = subparsers.add_parser('charts', parents=[common], help='生成图表')
+    charts.add_argument('--format', default='png', choices=['png', 'svg', 'webp'], help='输出格式 (默认 png)')
+    charts.add_argument('--dpi', type=int, default=300, help='栅格格式的分辨率 (默认 300)')
+    charts.add_argument('--jobs', type=int, default=None, help='并行进程数 (默认CPU核数)')
+    charts.add_argument('--force', action='store_true', help='输入没变也重画')
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # 不写子命令时等同于 render, 兼容 python3 generate_report.py [--charts]
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['render'] + argv
+    args = build_parser().parse_args(argv)
+
+    timer = PhaseTimer()
+    timer.mark('导入')
+    if args.metrics or args.profile:
+        instrument.configure(args.metrics, args.profile)
+    params = {}
+    if args.command == 'monitor':
+        params = {'monitor_window': args.window, 'monitor_baseline': args.baseline,
+                  'monitor_min_leads': args.min_leads}
+    elif args.command == 'scenarios' and args.replicates:
+        params = {'bootstrap_replicates': args.replicates}
+    with instrument.stage('fingerprint'):
+        pipeline = load_pipeline(use_cache=not args.no_cache, **params)
+    if pipeline is None:
+        return
+    timer.mark('指纹')
+    with instrument.stage(args.command, kind='command'):
+        COMMANDS[args.command](pipeline, args)
+    timer.mark(args.command)
+    if args.timing:
+        timer.report(pipeline)
 
 if __name__ == '__main__':
-    generate_report()
+    main()
@@ -0,0 +1,4 @@
+"""
+Lead Quality分析共享模块
+报告脚本、可视化脚本和notebooks共用的计算逻辑
+"""
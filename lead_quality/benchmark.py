@@ -0,0 +1,254 @@
+"""
+端到端性能基准
+在合成数据 (lead_quality.synthetic) 上按数据规模逐个阶段计时和测内存:
+清洗 / calculate_baseline / analyze_trend / top_segments / analyze_uplift_scenarios / 图表渲染;
+每个阶段先重复计时, 再在 tracemalloc 下跑一次记录峰值分配;
+每次运行存为 .benchmarks/ 下的一个JSON文件, 并与上一次运行逐项对比
+
+用法:
+    python -m lead_quality.benchmark --rows 10000 100000 1000000
+    python -m lead_quality.benchmark --show .benchmarks/benchmark-20091001-120000.json
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = '.benchmarks'
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+DEFAULT_REPEAT = 3
+DEFAULT_DPI = 100
+
+STAGES = ['cleaning', 'calculate_baseline', 'analyze_trend', 'top_segments', 'analyze_uplift_scenarios',
+          'charts']
+
+
+def _max_rss_mb():
+    """进程至今的峰值常驻内存 (Linux 上 ru_maxrss 单位是KB, macOS 上是字节)"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if platform.system() == 'Darwin' else rss / 1e3
+
+
+def measure(func, repeat=DEFAULT_REPEAT):
+    """
+    返回 (结果, 测量值); seconds / cpu_seconds 取 repeat 次计时中的最小值,
+    之后再在 tracemalloc 下跑一次, peak_mb 为峰值分配 (Python对象和numpy数组), 不含首次导入模块等一次性开销
+    """
+    wall, cpu = [], []
+    for _ in range(max(repeat, 1)):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        func()
+        wall.append(time.perf_counter() - start_wall)
+        cpu.append(time.process_time() - start_cpu)
+
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        'seconds': min(wall),
+        'seconds_median': statistics.median(wall),
+        'cpu_seconds': min(cpu),
+        'peak_mb': peak / 1e6,
+        'max_rss_mb': _max_rss_mb(),
+    }
+
+
+def _stage_functions(state, dpi, out_dir):
+    """阶段名 -> 无参函数; 每个阶段的输入取自 state 中前面阶段的结果"""
+    from lead_quality.cleaning import VENDOR_ID_COL, clean_leads
+    from lead_quality.cube import SegmentCube
+    from lead_quality.pipeline import (DEFAULT_PARAMS, analyze_trend, analyze_uplift_scenarios,
+                                       calculate_baseline, score_columns)
+    from lead_quality.scenarios import DEFAULT_CUT_PERCENTAGES, GatingIndex, cut_tail_curve
+    from lead_quality.segments import top_segments
+
+    def cleaning():
+        return clean_leads(state['raw'].drop_duplicates(subset=[VENDOR_ID_COL], keep='first'))
+
+    def segments():
+        cube = SegmentCube.from_frame(state['cleaning'])
+        table = cube.segment_stats(cube.dimensions, baseline_rate=state['calculate_baseline']['GoodQualityRate'],
+                                   min_leads=DEFAULT_PARAMS['min_leads'])
+        return top_segments(table, n=DEFAULT_PARAMS['top_n'])
+
+    def scenarios():
+        df, baseline = state['cleaning'], state['calculate_baseline']
+        curve = cut_tail_curve(baseline['good_count'], baseline['all_leads'], DEFAULT_CUT_PERCENTAGES)
+        gating = GatingIndex.from_frame(df, *score_columns(df.columns))
+        return analyze_uplift_scenarios(curve, gating, *score_columns(df.columns),
+                                        target_rate=DEFAULT_PARAMS['target_rate'])
+
+    def charts():
+        for name, func, inputs in state['chart_specs']:
+            func(path=os.path.join(out_dir, f'{name}.png'), dpi=dpi, **inputs)
+
+    return {
+        'cleaning': cleaning,
+        'calculate_baseline': lambda: calculate_baseline(state['cleaning']),
+        'analyze_trend': lambda: analyze_trend(state['cleaning']),
+        'top_segments': segments,
+        'analyze_uplift_scenarios': scenarios,
+        'charts': charts,
+    }
+
+
+def _chart_specs(df):
+    """图表的输入 (流水线节点), 不计入图表阶段的耗时"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from generate_visualizations import chart_specs
+    from lead_quality.pipeline import Pipeline, clear_memo
+
+    specs = chart_specs(Pipeline(df=df))
+    clear_memo()
+    return specs
+
+
+def run_size(n_rows, stages=None, repeat=DEFAULT_REPEAT, dpi=DEFAULT_DPI, seed=0, progress=print):
+    """在 n_rows 行合成数据上依次测量各阶段, 返回每个阶段一条记录"""
+    from lead_quality.synthetic import generate_leads
+
+    stages = STAGES if stages is None else stages
+    start = time.perf_counter()
+    state = {'raw': generate_leads(n_rows, seed=seed)}
+    progress(f"{n_rows:,} 行: 生成合成数据 {time.perf_counter() - start:.1f} 秒")
+
+    records = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        functions = _stage_functions(state, dpi, out_dir)
+        for stage in STAGES:
+            # 没选中的阶段也要算一次, 后面的阶段依赖它的结果
+            if stage not in stages:
+                if stage != 'charts':
+                    state[stage] = functions[stage]()
+                continue
+            if stage == 'charts':
+                state['chart_specs'] = _chart_specs(state['cleaning'])
+            input_rows = len(state['raw'] if stage == 'cleaning' else state['cleaning'])
+            # 渲染函数每张图打印一行, 计时时不输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                state[stage], result = measure(functions[stage], repeat=repeat)
+            records.append({'rows': n_rows, 'stage': stage, 'input_rows': input_rows, **result})
+            progress(f"  {stage:<26} {result['seconds'] * 1000:10.1f} ms  峰值分配 {result['peak_mb']:8.1f} MB")
+    return records
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(rows=None, stages=None, repeat=DEFAULT_REPEAT, dpi=DEFAULT_DPI, seed=0, progress=print):
+    """全部规模的测量结果和运行环境"""
+    rows = DEFAULT_ROWS if rows is None else rows
+    records = []
+    for n_rows in rows:
+        records.extend(run_size(n_rows, stages=stages, repeat=repeat, dpi=dpi, seed=seed, progress=progress))
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'rows': list(rows),
+        'repeat': repeat,
+        'dpi': dpi,
+        'seed': seed,
+        'results': records,
+    }
+
+
+def save_run(run, directory=RESULTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_run(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def previous_run_path(directory=RESULTS_DIR, before=None):
+    """目录中最近的一次运行 (文件名按时间排序); before 给出时取它之前的一次"""
+    paths = sorted(glob.glob(os.path.join(directory, 'benchmark-*.json')))
+    if before is not None:
+        paths = [path for path in paths if os.path.basename(path) < os.path.basename(before)]
+    return paths[-1] if paths else None
+
+
+def compare_runs(current, previous):
+    """逐 (规模, 阶段) 对比两次运行; ratio < 1 表示变快 / 变省"""
+    keys = ['rows', 'stage']
+    now = pd.DataFrame(current['results'])[keys + ['seconds', 'peak_mb']]
+    before = pd.DataFrame(previous['results'])[keys + ['seconds', 'peak_mb']]
+    table = now.merge(before, on=keys, how='left', suffixes=('', '_before'))
+    table['time_ratio'] = table['seconds'] / table['seconds_before']
+    table['memory_ratio'] = table['peak_mb'] / table['peak_mb_before']
+    return table[keys + ['seconds_before', 'seconds', 'time_ratio', 'peak_mb_before', 'peak_mb', 'memory_ratio']]
+
+
+def print_run(run, previous=None):
+    print(f"{run['created_at']}  commit {run['commit'] or '-'}  python {run['python']}  "
+          f"pandas {run['pandas']}  {run['cpu_count']} 核")
+    table = pd.DataFrame(run['results'])[['rows', 'stage', 'seconds', 'cpu_seconds', 'peak_mb', 'max_rss_mb']]
+    if previous is not None:
+        print(f"对比 {previous['created_at']} (commit {previous['commit'] or '-'}):")
+        table = compare_runs(run, previous)
+    pd.set_option('display.width', 200)
+    print(table.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成数据上的端到端性能基准')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help=f"数据规模 (默认 {' '.join(map(str, DEFAULT_ROWS))})")
+    parser.add_argument('--stages', nargs='+', default=None, choices=STAGES, help='只测这些阶段 (默认全部)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'计时重复次数 (默认 {DEFAULT_REPEAT})')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help=f'图表分辨率 (默认 {DEFAULT_DPI})')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子 (默认 0)')
+    parser.add_argument('--results', default=RESULTS_DIR, help=f'结果目录 (默认 {RESULTS_DIR})')
+    parser.add_argument('--compare', default=None, help='与这次运行的结果文件对比 (默认上一次运行)')
+    parser.add_argument('--no-save', action='store_true', help='不保存本次结果')
+    parser.add_argument('--show', default=None, help='只显示已保存的结果文件 (与它之前的一次对比)')
+    args = parser.parse_args()
+
+    if args.show:
+        previous = previous_run_path(args.results, before=args.show)
+        print_run(load_run(args.show), load_run(previous) if previous else None)
+        return
+
+    previous = args.compare or previous_run_path(args.results)
+    run = run_benchmark(args.rows, stages=args.stages, repeat=args.repeat, dpi=args.dpi, seed=args.seed)
+    print()
+    print_run(run, load_run(previous) if previous else None)
+    if not args.no_save:
+        print(f"\n结果已保存: {save_run(run, args.results)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Uplift情景的bootstrap不确定性
+在汇总计数上做向量化抽样 (与逐行重抽样同分布), 不复制原始数据:
+- Scenario A (砍尾巴): 总good数 ~ Binomial(N, p), 代入 cut_tail_curve 的公式
+- Scenario B (再分配): 固定用观测数据求得的方案 (各分群的新量), 各分群 good ~ Binomial(leads, rate),
+  得到按这个方案执行时质量的分布
+- Scenario C (分数门槛): (PhoneScore, AddressScore) 格子 × good/bad 的计数 ~ Multinomial(N, 观测占比),
+  门槛后的量和质量都随之变化
+重复抽样按固定大小分批, 每批一个独立的随机流 (SeedSequence.spawn), 各批在进程池中并行,
+结果只取决于 seed, 与进程数无关
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_REPLICATES = 10_000
+BATCH_SIZE = 2_500
+
+
+def cut_tail_spec(name, good_count, total, cut_pct):
+    """Scenario A: 砍掉 cut_pct% 的流量 (先砍bad)"""
+    cut_n = int(np.floor(total * cut_pct / 100))
+    return {'name': name, 'kind': 'cut_tail', 'good_count': int(good_count), 'total': int(total), 'cut_n': cut_n}
+
+
+def reallocation_spec(name, leads, good_count, new_leads):
+    """Scenario B: 各分群的当前量、good数和方案中的新量 (见 scenarios.optimize_reallocation)"""
+    leads = np.asarray(leads, dtype=np.int64)
+    keep = leads > 0
+    return {'name': name, 'kind': 'reallocation', 'leads': leads[keep],
+            'good_count': np.asarray(good_count, dtype=np.int64)[keep],
+            'new_leads': np.asarray(new_leads, dtype=np.float64)[keep]}
+
+
+def gating_spec(name, gating, phone_min=None, address_min=None):
+    """Scenario C: scenarios.GatingIndex 的格子计数, 以及通过门槛的格子"""
+    total, good = gating.cell_counts()
+    passed = np.zeros(total.shape, dtype=bool)
+    passed[gating.threshold_cells(phone_min, address_min)] = True
+    return {'name': name, 'kind': 'gating', 'good': good.ravel(), 'bad': (total - good).ravel(),
+            'passed': passed.ravel()}
+
+
+def _rate(good, total):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, good / np.maximum(total, 1), np.nan)
+
+
+def point_rate(spec):
+    """观测数据上的情景质量"""
+    return float(_draw(spec, None, 0))
+
+
+def _draw(spec, rng, size):
+    """size 次重抽样的情景质量; rng 为 None 时返回观测数据上的值"""
+    kind = spec['kind']
+    if kind == 'cut_tail':
+        total, cut_n = spec['total'], spec['cut_n']
+        good = spec['good_count'] if rng is None else rng.binomial(total, spec['good_count'] / total, size)
+        removed_good = np.maximum(0, cut_n - (total - good))
+        return _rate(good - removed_good, np.asarray(total - cut_n))
+    if kind == 'reallocation':
+        leads, new_leads = spec['leads'], spec['new_leads']
+        good = spec['good_count'] if rng is None else rng.binomial(leads, spec['good_count'] / leads, (size, len(leads)))
+        return _rate((good / leads) @ new_leads, np.asarray(new_leads.sum()))
+    if kind == 'gating':
+        counts = np.concatenate([spec['good'], spec['bad']])
+        if rng is not None:
+            counts = rng.multinomial(counts.sum(), counts / counts.sum(), size)
+        good, bad = counts[..., :len(spec['good'])], counts[..., len(spec['good']):]
+        passed = spec['passed']
+        return _rate(good[..., passed].sum(axis=-1), (good + bad)[..., passed].sum(axis=-1))
+    raise ValueError(f"未知情景类型: {kind}")
+
+
+def _run_batch(specs, seed, size):
+    """一批重抽样: (size, 情景数) 的质量矩阵"""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([_draw(spec, rng, size) for spec in specs])
+
+
+def bootstrap_scenarios(specs, target_rate=0.096, n_replicates=DEFAULT_REPLICATES, jobs=None, seed=0, alpha=0.05):
+    """
+    各情景质量的bootstrap分布
+    返回每个情景一行: 观测质量、重抽样均值和 1-alpha 百分位区间、达到目标的概率
+    (及其 Wilson 区间, 反映重抽样次数有限带来的误差)
+    """
+    from lead_quality.intervals import proportion_ci
+
+    sizes = [BATCH_SIZE] * (n_replicates // BATCH_SIZE)
+    if n_replicates % BATCH_SIZE:
+        sizes.append(n_replicates % BATCH_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    jobs = min(jobs or os.cpu_count() or 1, len(sizes))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            batches = list(pool.map(_run_batch, [specs] * len(sizes), seeds, sizes))
+    else:
+        batches = [_run_batch(specs, s, size) for s, size in zip(seeds, sizes)]
+    rates = np.vstack(batches)
+
+    valid = ~np.isnan(rates)
+    reached = ((rates >= target_rate) & valid).sum(axis=0)
+    n_valid = valid.sum(axis=0)
+    p_lower, p_upper = proportion_ci(reached, n_valid, alpha=alpha, method='wilson')
+    with np.errstate(invalid='ignore'):
+        lower, upper = np.nanquantile(rates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return pd.DataFrame({
+        'scenario': [spec['name'] for spec in specs],
+        'new_rate': [point_rate(spec) for spec in specs],
+        'rate_mean': np.nanmean(rates, axis=0),
+        'rate_ci_lower': lower,
+        'rate_ci_upper': upper,
+        'p_reach_target': reached / np.maximum(n_valid, 1),
+        'p_reach_ci_lower': p_lower,
+        'p_reach_ci_upper': p_upper,
+        'replicates': n_valid,
+    })
@@ -0,0 +1,100 @@
+"""
+磁盘结果缓存
+结果按内容寻址: 键是 (数据指纹, 节点名, 参数) 的哈希, 每个键一个pickle文件;
+读取时刷新文件时间, 总大小超过上限时按最久未使用淘汰 (LRU)
+"""
+
+import glob
+import hashlib
+import os
+import pickle
+
+CACHE_DIR = '.report_cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 节点的计算逻辑变化时递增, 使旧的缓存结果全部失效
+CACHE_VERSION = 5
+
+_MISSING = object()
+
+
+class ResultCache:
+    """按键存取pickle结果, 总大小不超过 max_bytes"""
+
+    def __init__(self, path=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1(repr((CACHE_VERSION,) + parts).encode('utf-8')).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def get(self, key, default=None):
+        file_path = self._file(key)
+        try:
+            with open(file_path, 'rb') as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        # 刷新访问时间, 淘汰时按它排序
+        os.utime(file_path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """写入结果; 单个结果超过 max_bytes 时不写入, 也不淘汰其他结果, 返回是否写入"""
+        os.makedirs(self.path, exist_ok=True)
+        file_path = self._file(key)
+        tmp_path = f'{file_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if os.path.getsize(tmp_path) > self.max_bytes:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, file_path)
+        self.evict()
+        return True
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def entries(self):
+        """(文件, 大小, 最近使用时间), 按最近使用时间从旧到新"""
+        entries = []
+        for file_path in glob.glob(os.path.join(self.path, '*.pkl')):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((file_path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """删除最久未使用的结果, 直到总大小不超过上限"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for file_path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for file_path, _, _ in self.entries():
+            os.remove(file_path)
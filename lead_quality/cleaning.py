@@ -0,0 +1,247 @@
+"""
+数据清洗与特征工程
+01_load_and_clean.ipynb 中的转换逻辑, 可以作用于完整数据, 也可以逐块 (chunk) 调用
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# 原始导出文件中的列
+VENDOR_ID_COL = 'VendorLeadID'
+DATE_COL = 'LeadCreated'
+CALL_STATUS_COL = 'CallStatus'
+WIDGET_COL = 'WidgetName'
+PUBLISHER_ZONE_COL = 'PublisherZoneName'
+PUBLISHER_CAMPAIGN_COL = 'PublisherCampaignName'
+ADDRESS_SCORE_COL = 'AddressScore'
+PHONE_SCORE_COL = 'PhoneScore'
+ADVERTISER_CAMPAIGN_COL = 'AdvertiserCampaignName'
+STATE_COL = 'State'
+DEBT_COL = 'DebtLevel'
+CAMPAIGN_COL = 'MarketingCampaign'
+
+
+# CallStatus分组规则: 按顺序匹配, 小写后包含任一关键字即归入该组, 都不命中为 unknown
+STATUS_RULES = [
+    ('closed', ['closed']),
+    ('good', ['ep sent', 'ep received', 'ep confirmed']),
+    ('bad', ['unable to contact', 'invalid profile', "doesn't qualify", "doesnt qualify"]),
+]
+UNKNOWN_STATUS = 'unknown'
+GOOD_STATUS_GROUPS = ['closed', 'good']
+
+
+class StatusClassifier:
+    """
+    CallStatus分类器
+    每个不同的原始取值只按规则匹配一次 (结果缓存), 整列通过类别编码映射
+    """
+
+    def __init__(self, rules=STATUS_RULES, default=UNKNOWN_STATUS):
+        self.rules = [(group, [keyword.lower() for keyword in keywords]) for group, keywords in rules]
+        self.default = default
+        self.groups = list(dict.fromkeys([group for group, _ in self.rules] + [default]))
+        self._cache = {}
+
+    def classify(self, status):
+        """单个取值的分组"""
+        if pd.isna(status):
+            return self.default
+        if status not in self._cache:
+            status_str = str(status).strip().lower()
+            group = self.default
+            for rule_group, keywords in self.rules:
+                if any(keyword in status_str for keyword in keywords):
+                    group = rule_group
+                    break
+            self._cache[status] = group
+        return self._cache[status]
+
+    def group_codes(self, status_series):
+        """整列的分组编码 (对应 self.groups)"""
+        codes, uniques = pd.factorize(status_series)
+        group_index = {group: i for i, group in enumerate(self.groups)}
+        lookup = np.array([group_index[self.classify(value)] for value in uniques] +
+                          [group_index[self.default]], dtype=np.int8)
+        # factorize把缺失值编码为-1, 正好取到lookup最后一位的默认组
+        return lookup[codes]
+
+    def map(self, status_series):
+        """整列映射为分组 (category)"""
+        return pd.Series(pd.Categorical.from_codes(self.group_codes(status_series), categories=self.groups),
+                         index=status_series.index)
+
+
+STATUS_CLASSIFIER = StatusClassifier()
+
+
+def map_call_status(status):
+    """CallStatus映射为 closed/good/bad/unknown 四组"""
+    return STATUS_CLASSIFIER.classify(status)
+
+
+WIDGET_FIELDS = ['ad_size', 'dc_pages', 'design', 'bg_color']
+
+
+@lru_cache(maxsize=None)
+def _decode_widget(name_str):
+    """按 '_' 拆分WidgetName, 返回 (ad_size, dc_pages, design, bg_color); 结果按名称缓存"""
+    parts = name_str.split('_')
+    ad_size = dc_pages = design = bg_color = None
+
+    if len(parts) >= 1:
+        size = parts[0]
+        if size in ['300250', '302252']:
+            ad_size = '302252'
+        else:
+            ad_size = size
+
+    if len(parts) >= 2:
+        dc = parts[1].upper()
+        if '1DC' in dc or '1' in dc:
+            dc_pages = '1DC'
+        elif '2DC' in dc or '2' in dc:
+            dc_pages = '2DC'
+
+    if len(parts) >= 3:
+        design = parts[2]
+
+    if len(parts) >= 4:
+        bg_color = parts[3]
+
+    return ad_size, dc_pages, design, bg_color
+
+
+def parse_widget_name(name):
+    """解析WidgetName: ad_size / dc_pages / design / bg_color, 300250与302252合并"""
+    if pd.isna(name):
+        return dict.fromkeys(WIDGET_FIELDS)
+    return dict(zip(WIDGET_FIELDS, _decode_widget(str(name).strip())))
+
+
+def decode_widget_names(widget_series):
+    """
+    整列解析WidgetName
+    每个不同的名称只解析一次, 四个字段直接按类别编码生成 category 列
+    """
+    codes, uniques = pd.factorize(widget_series)
+    decoded = [_decode_widget(str(name).strip()) for name in uniques]
+    result = {}
+    for i, field in enumerate(WIDGET_FIELDS):
+        field_codes, categories = pd.factorize(np.array([row[i] for row in decoded], dtype=object))
+        # 末位对应缺失的WidgetName (factorize编码为-1), 解析结果为空
+        lookup = np.append(field_codes, -1)
+        result[field] = pd.Categorical.from_codes(lookup[codes], categories=categories)
+    return pd.DataFrame(result, index=widget_series.index)
+
+
+def bin_score(score_series, name=None):
+    """AddressScore/PhoneScore分箱: 1-2 / 3-4 / 5 / missing"""
+    result = score_series.copy().astype(str)
+    result[score_series.isna()] = 'missing'
+    result[(score_series >= 1) & (score_series <= 2)] = '1-2'
+    result[(score_series >= 3) & (score_series <= 4)] = '3-4'
+    result[score_series == 5] = '5'
+    return result
+
+
+def add_status_labels(df, status_col=CALL_STATUS_COL, classifier=STATUS_CLASSIFIER):
+    """status_group 和 is_good/is_closed/is_bad 标签"""
+    codes = classifier.group_codes(df[status_col])
+    groups = np.array(classifier.groups)
+    df['status_group'] = pd.Categorical.from_codes(codes, categories=classifier.groups)
+    df['is_good'] = np.isin(groups, GOOD_STATUS_GROUPS)[codes].astype(int)
+    df['is_closed'] = (groups == 'closed')[codes].astype(int)
+    df['is_bad'] = (groups == 'bad')[codes].astype(int)
+    return df
+
+
+def add_time_fields(df, origin=None):
+    """date/week/dow/day_index; day_index相对origin计算, 默认取本批数据的最早时间"""
+    df[DATE_COL] = pd.to_datetime(df[DATE_COL], errors='coerce')
+    if origin is None:
+        origin = df[DATE_COL].min()
+    df['date'] = df[DATE_COL].dt.date
+    df['week'] = df[DATE_COL].dt.to_period('W')
+    df['dow'] = df[DATE_COL].dt.day_name()
+    df['day_index'] = (df[DATE_COL] - origin).dt.days
+    return df
+
+
+def add_widget_fields(df, widget_col=WIDGET_COL):
+    """WidgetName拆分出的四列"""
+    decoded = decode_widget_names(df[widget_col])
+    for field in WIDGET_FIELDS:
+        df[field] = decoded[field]
+    return df
+
+
+def add_segment_fields(df):
+    """call center/zone/分数分箱/branded/state/traffic_type"""
+    df['is_call_center'] = df[PUBLISHER_CAMPAIGN_COL].astype(str).str.contains('Call Center', case=False, na=False)
+    df['publisher_zone'] = df[PUBLISHER_ZONE_COL]
+    df['address_score_bin'] = bin_score(df[ADDRESS_SCORE_COL], 'AddressScore')
+    df['phone_score_bin'] = bin_score(df[PHONE_SCORE_COL], 'PhoneScore')
+    df['is_branded'] = df[ADVERTISER_CAMPAIGN_COL].astype(str).str.contains(
+        'branded|creditsolutions', case=False, na=False
+    )
+    df['state'] = df[STATE_COL]
+    df['traffic_type'] = df[CAMPAIGN_COL].astype(str).str.contains('content', case=False, na=False)
+    df['traffic_type'] = df['traffic_type'].map({True: 'content', False: 'search'})
+    return df
+
+
+def _score_bin(score):
+    """bin_score 的单值版本"""
+    if score is None or pd.isna(score):
+        return 'missing'
+    score = float(score)
+    if 1 <= score <= 2:
+        return '1-2'
+    if 3 <= score <= 4:
+        return '3-4'
+    if score == 5:
+        return '5'
+    return str(score)
+
+
+def lead_fields(record):
+    """
+    单条原始lead (列名 -> 值) 的widget/分群字段, 与 add_widget_fields + add_segment_fields 的结果一致;
+    用于入口处逐条打分, 不构造DataFrame. debt_bin 依赖全量分位点, 不在其中
+    """
+    fields = parse_widget_name(record.get(WIDGET_COL))
+    campaign = record.get(PUBLISHER_CAMPAIGN_COL)
+    advertiser = record.get(ADVERTISER_CAMPAIGN_COL)
+    zone = record.get(PUBLISHER_ZONE_COL)
+    state = record.get(STATE_COL)
+    fields.update({
+        'is_call_center': campaign is not None and not pd.isna(campaign) and 'call center' in str(campaign).lower(),
+        'publisher_zone': None if zone is None or pd.isna(zone) else zone,
+        'address_score_bin': _score_bin(record.get(ADDRESS_SCORE_COL)),
+        'phone_score_bin': _score_bin(record.get(PHONE_SCORE_COL)),
+        'is_branded': advertiser is not None and not pd.isna(advertiser) and any(
+            keyword in str(advertiser).lower() for keyword in ('branded', 'creditsolutions')),
+        'state': None if state is None or pd.isna(state) else state,
+        'traffic_type': 'content' if 'content' in str(record.get(CAMPAIGN_COL)).lower() else 'search',
+    })
+    return fields
+
+
+def add_debt_bin(df):
+    """债务三分位分箱; 分位点依赖全量数据, 不能逐块计算"""
+    if DEBT_COL in df.columns and pd.api.types.is_numeric_dtype(df[DEBT_COL]):
+        df['debt_bin'] = pd.qcut(df[DEBT_COL], q=3, labels=['Low', 'Medium', 'High'], duplicates='drop')
+    return df
+
+
+def clean_leads(df, origin=None):
+    """对一批原始leads执行全部逐行转换 (不含去重和debt_bin)"""
+    df = df.copy()
+    add_status_labels(df)
+    add_time_fields(df, origin=origin)
+    add_widget_fields(df)
+    add_segment_fields(df)
+    return df
@@ -0,0 +1,122 @@
+"""
+多维分群计数立方体
+对全部分群维度的交叉组合只汇总一次 (只保存非空的格子) leads/good/closed/bad 四个计数;
+任意维度组合的分群表 (roll-up) 和按取值过滤 (slice) 都在格子上计算, 不再扫描原始数据,
+代价只和格子数有关
+
+用法:
+    python3 generate_report.py segments --by publisher_zone,traffic_type,phone_score_bin --where is_branded=True
+"""
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.segments import DEFAULT_DIMENSIONS, SEGMENT_METRIC_COLUMNS, add_segment_metrics
+
+COUNT_COLUMNS = ['leads', 'good_count', 'closed_count', 'bad_count']
+
+
+def _group(codes, sizes):
+    """
+    多列编码的分组: 合成混合进制的整数键 (快要溢出时先压缩成排名, 不改变顺序),
+    返回 (每组第一行的位置, 每行所属的组); 组按各列编码的字典序排列
+    """
+    n = len(codes[0]) if codes else 0
+    key = np.zeros(n, dtype=np.int64)
+    limit = np.iinfo(np.int64).max
+    for column, size in zip(codes, sizes):
+        if n and key.max() >= limit // max(size, 1):
+            _, key = np.unique(key, return_inverse=True)
+        key = key * size + column
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+class SegmentCube:
+    """
+    codes[dim]: 每个格子在该维度上的取值编码; labels[dim]: 编码对应的取值 (字符串, 缺失值为 'missing',
+    顺序与该维度在数据中首次出现的顺序一致); counts: 每个格子的四个计数
+    """
+
+    def __init__(self, dimensions, labels, codes, counts):
+        self.dimensions = list(dimensions)
+        self.labels = labels
+        self.codes = codes
+        self.counts = counts
+        # 检验时的"全体"是立方体内的全部leads, slice 之后即切片内的leads
+        self.all_good = int(counts['good_count'].sum())
+        self.all_total = int(counts['leads'].sum())
+
+    @classmethod
+    def from_frame(cls, df, dimensions=None):
+        """按 dimensions (默认 segments.DEFAULT_DIMENSIONS 中存在的列) 汇总"""
+        dimensions = [dim for dim in (DEFAULT_DIMENSIONS if dimensions is None else dimensions) if dim in df.columns]
+        labels, row_codes = {}, []
+        for dim in dimensions:
+            codes, uniques = pd.factorize(df[dim], use_na_sentinel=False)
+            labels[dim] = ['missing' if pd.isna(v) else str(v) for v in uniques]
+            row_codes.append(codes.astype(np.int64))
+
+        first, inverse = _group(row_codes, [len(labels[dim]) for dim in dimensions])
+        counts = {'leads': np.bincount(inverse, minlength=len(first))}
+        for flag, name in [('is_good', 'good_count'), ('is_closed', 'closed_count'), ('is_bad', 'bad_count')]:
+            weights = df[flag].to_numpy(dtype=np.float64)
+            counts[name] = np.rint(np.bincount(inverse, weights=weights, minlength=len(first))).astype(np.int64)
+        codes = {dim: column[first] for dim, column in zip(dimensions, row_codes)}
+        return cls(dimensions, labels, codes, counts)
+
+    @property
+    def n_cells(self):
+        return len(self.counts['leads'])
+
+    def _filter_mask(self, filters):
+        mask = np.ones(self.n_cells, dtype=bool)
+        for dim, values in filters.items():
+            if dim not in self.labels:
+                raise KeyError(f"立方体中没有维度 {dim}, 可选: {self.dimensions}")
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            wanted = [self.labels[dim].index(str(v)) for v in values if str(v) in self.labels[dim]]
+            mask &= np.isin(self.codes[dim], wanted)
+        return mask
+
+    def slice(self, **filters):
+        """只保留满足 维度=取值 (取值可以是列表) 的格子; 取值按字符串比较, 如 is_branded='True'"""
+        mask = self._filter_mask(filters)
+        return SegmentCube(self.dimensions, self.labels, {dim: codes[mask] for dim, codes in self.codes.items()},
+                           {name: values[mask] for name, values in self.counts.items()})
+
+    def rollup(self, dimensions):
+        """
+        按若干维度汇总的计数表, 每个取值组合一行 (没有leads的组合不出现);
+        行按各维度编码排序, 单个维度时与 segments.group_counts 的顺序一致
+        """
+        dimensions = list(dimensions)
+        unknown = [dim for dim in dimensions if dim not in self.labels]
+        if unknown:
+            raise KeyError(f"立方体中没有维度 {unknown}, 可选: {self.dimensions}")
+        first, inverse = _group([self.codes[dim] for dim in dimensions], [len(self.labels[dim]) for dim in dimensions])
+        table = pd.DataFrame({dim: np.asarray(self.labels[dim], dtype=object)[self.codes[dim][first]]
+                              for dim in dimensions})
+        for name, values in self.counts.items():
+            table[name] = np.bincount(inverse, weights=values, minlength=len(first)).astype(np.int64)
+        return table
+
+    def segment_table(self, dimensions, baseline_rate=None, min_leads=0, ci_method='normal', alpha=0.05):
+        """任意维度组合的分群表: 计数 + 比率、lift、置信区间、vs 其余的检验 (见 segments.add_segment_metrics)"""
+        return add_segment_metrics(self.rollup(dimensions), self.all_good, self.all_total,
+                                   baseline_rate=baseline_rate, min_leads=min_leads, ci_method=ci_method,
+                                   alpha=alpha)
+
+    def segment_stats(self, dimensions, baseline_rate=None, min_leads=0, ci_method='normal', alpha=0.05):
+        """与 segments.segment_stats 相同格式 (每个维度单独汇总, dimension/segment 两列)"""
+        tables = []
+        for dim in dimensions:
+            if dim in self.labels:
+                table = self.rollup([dim]).rename(columns={dim: 'segment'})
+                table.insert(0, 'dimension', dim)
+                tables.append(table)
+        if not tables:
+            return pd.DataFrame(columns=['dimension', 'segment'] + COUNT_COLUMNS + SEGMENT_METRIC_COLUMNS)
+        return add_segment_metrics(pd.concat(tables, ignore_index=True), self.all_good, self.all_total,
+                                   baseline_rate=baseline_rate, min_leads=min_leads, ci_method=ci_method,
+                                   alpha=alpha)
@@ -0,0 +1,58 @@
+"""
+驱动因素模型
+直接在 features.FeatureEncoder 的输出上拟合, 不构造稠密哑变量矩阵:
+- L2正则logistic回归 (lbfgs) 使用CSR one-hot矩阵
+- 直方图梯度提升使用整数编码, 每个特征作为原生类别特征
+"""
+
+import numpy as np
+import pandas as pd
+
+# 直方图梯度提升的原生类别特征最多支持的类别数 (含 other)
+MAX_CATEGORIES = 255
+
+
+def fit_logistic(X, y, feature_names, C=1.0, max_iter=1000):
+    """
+    L2正则logistic回归, X为稀疏one-hot矩阵
+    返回 (模型, 系数表); 系数表的标准误取正则化目标Hessian的逆 (近似Wald检验),
+    Hessian 是 特征数 × 特征数 的小矩阵, 由稀疏矩阵乘法得到
+    """
+    from scipy import sparse
+    from sklearn.linear_model import LogisticRegression
+    from lead_quality.hypothesis import two_sided_p
+
+    model = LogisticRegression(C=C, max_iter=max_iter).fit(X, y)
+
+    # 目标函数为 C * 对数损失 + 0.5 * ||coef||^2, 截距不加惩罚
+    proba = model.predict_proba(X)[:, 1]
+    weights = proba * (1 - proba)
+    design = sparse.hstack([np.ones((X.shape[0], 1)), X], format='csr')
+    hessian = (design.T @ design.multiply(weights[:, None])).toarray()
+    hessian[1:, 1:] += np.eye(X.shape[1]) / C
+    std_err = np.sqrt(np.diag(np.linalg.pinv(hessian)))[1:]
+
+    coef = model.coef_[0]
+    table = pd.DataFrame({
+        'feature': feature_names,
+        'coef': coef,
+        'std_err': std_err,
+        'p_value': two_sided_p(coef / std_err),
+        'abs_coef': np.abs(coef),
+    })
+    return model, table.sort_values('abs_coef', ascending=False).reset_index(drop=True)
+
+
+def fit_gradient_boosting(codes, y, max_iter=200, learning_rate=0.1, max_depth=None, random_state=42, **params):
+    """
+    直方图梯度提升, codes 为 FeatureEncoder.codes 的整数编码, 所有列按类别特征处理
+    单个特征的类别数超过 MAX_CATEGORIES 时需要提高编码器的 min_count
+    """
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    if codes.size and codes.max() >= MAX_CATEGORIES:
+        raise ValueError(f"类别数超过 {MAX_CATEGORIES}, 请提高 FeatureEncoder 的 min_count")
+    model = HistGradientBoostingClassifier(categorical_features=np.ones(codes.shape[1], dtype=bool),
+                                           max_iter=max_iter, learning_rate=learning_rate, max_depth=max_depth,
+                                           random_state=random_state, **params)
+    return model.fit(codes, y)
@@ -0,0 +1,188 @@
+"""
+驱动因素模型的交叉验证与参数网格
+按时间顺序切分 (扩展窗口: 用更早的数据训练, 预测紧接着的一段), 每折的编码矩阵只构造一次
+(编码器只在训练部分上fit), 可以缓存到单独的目录 (FOLD_CACHE_DIR, 不占用报告的结果缓存); 各折矩阵通过进程池的 initializer 每个进程只传一次,
+(参数组合 × 折) 的任务在进程池中并行, 汇总每个组合的 AUC / PR-AUC 均值和标准差
+
+用法:
+    python -m lead_quality.evaluation --splits 5 --jobs 8
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.features import FeatureEncoder
+
+DEFAULT_SPLITS = 5
+
+# 各折矩阵约为 行数 × 640 字节, 10万行以上就超过报告缓存的上限, 单独存放
+FOLD_CACHE_DIR = '.fold_cache'
+FOLD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# 默认的小网格: model 为 logistic / hgb / random_forest, 其余为模型参数
+DEFAULT_GRID = (
+    [{'model': 'logistic', 'C': C} for C in [0.1, 1.0, 10.0]]
+    + [{'model': 'hgb', 'learning_rate': lr, 'max_depth': depth, 'max_iter': 100}
+       for lr in [0.05, 0.1] for depth in [3, None]]
+    + [{'model': 'random_forest', 'n_estimators': 100, 'max_depth': depth, 'min_samples_leaf': leaf}
+       for depth in [5, 10] for leaf in [1, 20]]
+)
+
+# 子进程中的各折数据, 由 _init_worker 设置
+_FOLDS = None
+
+
+def time_folds(dates, n_splits=DEFAULT_SPLITS):
+    """
+    按时间顺序的扩展窗口切分: 数据按日期分成 n_splits + 1 段, 第 k 折用前 k 段训练、第 k+1 段测试;
+    段的边界落在日期变化处, 同一天的leads不会同时出现在训练和测试中. 返回 [(train_idx, test_idx), ...]
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    order = np.argsort(dates, kind='stable')
+    sorted_dates = dates[order]
+    bounds = np.linspace(0, len(dates), n_splits + 2).astype(int)
+    bounds = [int(np.searchsorted(sorted_dates, sorted_dates[b], side='left')) if b < len(dates) else b
+              for b in bounds]
+    folds = []
+    for k in range(1, n_splits + 1):
+        train, test = order[:bounds[k]], order[bounds[k]:bounds[k + 1]]
+        if len(train) and len(test):
+            folds.append((train, test))
+    return folds
+
+
+def build_fold_data(df, n_splits=DEFAULT_SPLITS, min_count=5):
+    """每折的 CSR矩阵 / 整数编码 / 标签, 编码器只在该折的训练部分上fit"""
+    y = df['is_good'].to_numpy()
+    folds = []
+    for train, test in time_folds(df['date'], n_splits):
+        encoder = FeatureEncoder(min_count=min_count).fit(df.iloc[train])
+        train_df, test_df = df.iloc[train], df.iloc[test]
+        folds.append({
+            'X_train': encoder.transform(train_df), 'X_test': encoder.transform(test_df),
+            'codes_train': encoder.codes(train_df), 'codes_test': encoder.codes(test_df),
+            'y_train': y[train], 'y_test': y[test],
+            'test_start': str(df['date'].iloc[test].min()),
+        })
+    return folds
+
+
+def fold_cache(path=FOLD_CACHE_DIR, max_bytes=FOLD_CACHE_MAX_BYTES):
+    """各折矩阵的缓存 (与报告的 .report_cache 分开, 有自己的大小上限)"""
+    from lead_quality.cache import ResultCache
+    return ResultCache(path, max_bytes=max_bytes)
+
+
+def _init_worker(folds):
+    global _FOLDS
+    _FOLDS = folds
+
+
+def _fit_predict(config, fold):
+    """一个参数组合在一折上的拟合和测试集打分"""
+    params = {key: value for key, value in config.items() if key != 'model'}
+    if config['model'] == 'logistic':
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(max_iter=1000, **params).fit(fold['X_train'], fold['y_train'])
+        return model.predict_proba(fold['X_test'])[:, 1]
+    if config['model'] == 'hgb':
+        from lead_quality.drivers import fit_gradient_boosting
+        model = fit_gradient_boosting(fold['codes_train'], fold['y_train'], **params)
+        return model.predict_proba(fold['codes_test'])[:, 1]
+    if config['model'] == 'random_forest':
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(random_state=42, n_jobs=1, **params).fit(fold['X_train'], fold['y_train'])
+        return model.predict_proba(fold['X_test'])[:, 1]
+    raise ValueError(f"未知模型: {config['model']}")
+
+
+def _run_task(config_id, config, fold_id):
+    from sklearn.metrics import average_precision_score, roc_auc_score
+    fold = _FOLDS[fold_id]
+    start = time.perf_counter()
+    proba = _fit_predict(config, fold)
+    fit_seconds = time.perf_counter() - start
+    y_test = fold['y_test']
+    # 测试集只有一类时 AUC 没有定义
+    scorable = 0 < y_test.sum() < len(y_test)
+    return {
+        'config_id': config_id,
+        'fold': fold_id,
+        'test_start': fold['test_start'],
+        'train_rows': len(fold['y_train']),
+        'test_rows': len(y_test),
+        'auc': roc_auc_score(y_test, proba) if scorable else np.nan,
+        'pr_auc': average_precision_score(y_test, proba) if scorable else np.nan,
+        'fit_seconds': fit_seconds,
+    }
+
+
+def _config_label(config):
+    return ', '.join(f'{key}={value}' for key, value in config.items())
+
+
+def evaluate_grid(df, grid=None, n_splits=DEFAULT_SPLITS, jobs=None, min_count=5, cache=None, fingerprint=None):
+    """
+    在时间顺序的交叉验证上评估参数网格
+    cache 为 fold_cache() 时, 各折矩阵按 (fingerprint, n_splits, min_count) 缓存; 不要传入报告的结果缓存,
+    大的矩阵会把报告节点的结果全部淘汰
+    返回 (汇总表: 每个组合的 AUC/PR-AUC 均值和标准差, 按AUC降序; 每折明细)
+    """
+    grid = list(DEFAULT_GRID if grid is None else grid)
+    if cache is not None:
+        if fingerprint is None:
+            from lead_quality.pipeline import data_fingerprint
+            fingerprint = data_fingerprint(df)
+        folds = cache.get_or_compute(cache.key('fold_data', fingerprint, n_splits, min_count),
+                                     lambda: build_fold_data(df, n_splits, min_count))
+    else:
+        folds = build_fold_data(df, n_splits, min_count)
+
+    tasks = [(config_id, config, fold_id) for config_id, config in enumerate(grid) for fold_id in range(len(folds))]
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(folds,)) as pool:
+            rows = list(pool.map(_run_task, *zip(*tasks)))
+    else:
+        _init_worker(folds)
+        rows = [_run_task(*task) for task in tasks]
+
+    detail = pd.DataFrame(rows)
+    summary = detail.groupby('config_id').agg(
+        auc_mean=('auc', 'mean'), auc_std=('auc', 'std'),
+        pr_auc_mean=('pr_auc', 'mean'), pr_auc_std=('pr_auc', 'std'),
+        folds=('auc', 'count'), fit_seconds=('fit_seconds', 'sum'),
+    ).reset_index()
+    summary.insert(1, 'config', [_config_label(grid[i]) for i in summary['config_id']])
+    summary = summary.sort_values('auc_mean', ascending=False).reset_index(drop=True)
+    return summary, detail
+
+
+def main():
+    from lead_quality.store import STORE_PATH, load_cleaned, store_fingerprint
+
+    parser = argparse.ArgumentParser(description='驱动因素模型的时间顺序交叉验证和参数网格')
+    parser.add_argument('--splits', type=int, default=DEFAULT_SPLITS, help=f'折数 (默认 {DEFAULT_SPLITS})')
+    parser.add_argument('--jobs', type=int, default=None, help='并行进程数 (默认CPU核数)')
+    parser.add_argument('--min-count', type=int, default=5, help='进入词表的最少出现次数 (默认 5)')
+    parser.add_argument('--store', default=STORE_PATH, help=f'存储路径 (默认 {STORE_PATH})')
+    parser.add_argument('--no-cache', action='store_true', help=f'不读写各折矩阵的缓存 ({FOLD_CACHE_DIR})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cache = None if args.no_cache else fold_cache()
+    summary, detail = evaluate_grid(load_cleaned(path=args.store), n_splits=args.splits, jobs=args.jobs,
+                                    min_count=args.min_count, cache=cache,
+                                    fingerprint=None if cache is None else store_fingerprint(args.store))
+    pd.set_option('display.width', 200)
+    print(f"{detail['fold'].nunique()} 折 × {len(summary)} 个参数组合, 耗时 {time.perf_counter() - start:.1f} 秒")
+    print(summary.drop(columns='config_id').to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+
+
+if __name__ == '__main__':
+    main()
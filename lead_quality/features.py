@@ -0,0 +1,112 @@
+"""
+特征编码
+分类特征按持久化的类别词表编码: scipy.sparse CSR one-hot 矩阵 (每行每个特征恰好一个1),
+或每个特征一列的整数编码 (直方图梯度提升的原生类别特征);
+词表按取值排序, 与数据的行顺序无关; 训练时没见过的取值和低频取值都归入该特征的 other 列
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+# 驱动因素模型使用的特征
+FEATURE_COLUMNS = ['dc_pages', 'design', 'bg_color', 'publisher_zone', 'is_call_center',
+                   'address_score_bin', 'phone_score_bin', 'is_branded', 'state', 'traffic_type', 'ad_size']
+
+OTHER = '__other__'
+
+# 词表文件格式变化时递增
+VOCABULARY_VERSION = 1
+
+
+def _factorize(series):
+    """整列编码, 返回 (每行的编码, 各编码对应的字符串取值); 缺失值编码为最后一位 'missing'"""
+    codes, uniques = pd.factorize(series)
+    names = np.array([str(v) for v in uniques] + ['missing'], dtype=object)
+    codes = np.where(codes < 0, len(uniques), codes)
+    return codes, names
+
+
+class FeatureEncoder:
+    """
+    分类特征编码器
+    fit 得到每个特征的类别词表 (出现次数 >= min_count 的取值), 之后 transform / codes 都按同一份词表编码,
+    词表可以 save / load, 保证训练和打分时列的含义一致
+    """
+
+    def __init__(self, columns=None, min_count=1):
+        self.columns = list(FEATURE_COLUMNS if columns is None else columns)
+        self.min_count = min_count
+        self.vocabulary = None
+
+    def fit(self, df):
+        """只使用 df 中存在的特征列"""
+        self.columns = [col for col in self.columns if col in df.columns]
+        self.vocabulary = {}
+        for col in self.columns:
+            codes, names = _factorize(df[col])
+            counts = pd.Series(np.bincount(codes, minlength=len(names)), index=names).groupby(level=0).sum()
+            self.vocabulary[col] = sorted(counts.index[counts >= self.min_count])
+        return self
+
+    @property
+    def n_features(self):
+        return sum(len(categories) + 1 for categories in self.vocabulary.values())
+
+    def feature_names(self):
+        """one-hot 矩阵各列的名称: 特征=取值, 每个特征最后一列是 other"""
+        return [f'{col}={category}' for col in self.columns for category in self.vocabulary[col] + [OTHER]]
+
+    def codes(self, df):
+        """(行数, 特征数) 的整数编码, 取值 0..len(词表), 最后一个编码是 other"""
+        if self.vocabulary is None:
+            raise ValueError("FeatureEncoder 还没有 fit")
+        result = np.empty((len(df), len(self.columns)), dtype=np.int32)
+        for j, col in enumerate(self.columns):
+            codes, names = _factorize(df[col])
+            categories = self.vocabulary[col]
+            lookup = pd.Index(categories).get_indexer(names)
+            lookup[lookup < 0] = len(categories)
+            result[:, j] = lookup[codes]
+        return result
+
+    def transform(self, df):
+        """CSR one-hot 矩阵, 每行 len(columns) 个非零元, 直接由整数编码构造"""
+        from scipy import sparse
+        codes = self.codes(df)
+        sizes = [len(self.vocabulary[col]) + 1 for col in self.columns]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        n_rows, n_cols = codes.shape
+        indices = (codes + offsets).ravel()
+        indptr = np.arange(0, n_rows * n_cols + 1, n_cols, dtype=np.int64)
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix((data, indices, indptr), shape=(n_rows, self.n_features))
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def to_dict(self):
+        return {
+            'version': VOCABULARY_VERSION,
+            'columns': self.columns,
+            'min_count': self.min_count,
+            'vocabulary': self.vocabulary,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('version') != VOCABULARY_VERSION:
+            raise ValueError(f"词表版本不匹配: {state.get('version')} != {VOCABULARY_VERSION}")
+        encoder = cls(columns=state['columns'], min_count=state['min_count'])
+        encoder.vocabulary = {col: list(categories) for col, categories in state['vocabulary'].items()}
+        return encoder
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
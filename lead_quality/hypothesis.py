@@ -0,0 +1,60 @@
+"""
+向量化的假设检验
+输入都是计数数组, 一次调用对所有分群/窗口同时给出统计量和p值, 不逐个调用 statsmodels;
+多重比较用 Benjamini-Hochberg 控制FDR
+"""
+
+import numpy as np
+
+
+def two_sided_p(z):
+    """标准正态双侧p值"""
+    from scipy import stats
+    return 2 * stats.norm.sf(np.abs(z))
+
+
+def two_proportion_ztest(good_a, total_a, good_b, total_b):
+    """双比例z检验 (合并方差, 与 proportions_ztest 一致), 返回 (z_stat, p_value); z>0 表示b高于a"""
+    good_a, total_a, good_b, total_b = (np.asarray(v, dtype=np.float64) for v in (good_a, total_a, good_b, total_b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (good_a + good_b) / (total_a + total_b)
+        se = np.sqrt(pooled * (1 - pooled) * (1 / total_a + 1 / total_b))
+        z_stat = (good_b / total_b - good_a / total_a) / se
+    return z_stat, two_sided_p(z_stat)
+
+
+def benjamini_hochberg(p_values, alpha=0.05):
+    """
+    Benjamini-Hochberg校正, 沿最后一维 (每行一组检验) 计算
+    NaN表示未检验, 不计入检验个数; 返回 (校正后p值, 是否拒绝原假设)
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    order = np.argsort(p_values, axis=-1)  # NaN排在最后
+    ranked = np.take_along_axis(p_values, order, axis=-1)
+    m = np.sum(~np.isnan(p_values), axis=-1, keepdims=True)
+    rank = np.arange(1, p_values.shape[-1] + 1)
+    adjusted = ranked * m / rank
+    # 从大到小取累计最小值; fmin 跳过NaN
+    adjusted = np.fmin.accumulate(adjusted[..., ::-1], axis=-1)[..., ::-1]
+    adjusted = np.where(np.isnan(ranked), np.nan, np.minimum(adjusted, 1.0))
+
+    result = np.empty_like(adjusted)
+    np.put_along_axis(result, order, adjusted, axis=-1)
+    return result, result < alpha
+
+
+def segment_vs_rest(good, total, all_good=None, all_total=None, alpha=0.05):
+    """
+    每个分群 vs 其余全部leads 的双比例z检验 (不和包含自身的整体比较), 再做BH校正
+    all_good / all_total 为全部leads的计数, 默认是 good / total 的合计 (即一个维度的全部取值)
+    返回 dict: z_stat (>0 表示高于其余) / p_value / p_adjusted / significant (校正后 < alpha)
+    """
+    good = np.asarray(good, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    all_good = good.sum() if all_good is None else all_good
+    all_total = total.sum() if all_total is None else all_total
+    z_stat, p_value = two_proportion_ztest(all_good - good, all_total - total, good, total)
+    # 分群就是全部leads时没有"其余", 不检验
+    p_value = np.where(np.isfinite(z_stat), p_value, np.nan)
+    p_adjusted, significant = benjamini_hochberg(p_value, alpha=alpha)
+    return {'z_stat': z_stat, 'p_value': p_value, 'p_adjusted': p_adjusted, 'significant': significant}
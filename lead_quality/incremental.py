@@ -0,0 +1,173 @@
+"""
+增量 (只追加) 导入
+新一批leads只和已持久化的ID集合比对去重, 只对新增行做清洗,
+并把新增行的日/周/分群计数合并进持久化的汇总表; 导入的代价只和新增量有关
+汇总表和清单 (已计入的part文件) 每块原子地提交一次, 中断或普通追加之后只补读清单里没有的part;
+清单覆盖整个存储时, 分析流水线的 baseline / daily_stats / weekly_stats / segment_table 直接读汇总表
+
+用法:
+    python -m lead_quality.incremental leads_2009-07-02.csv
+"""
+
+import argparse
+import glob
+import os
+
+import pandas as pd
+
+from lead_quality.ingest import DEFAULT_CHUNKSIZE, ingest
+from lead_quality.segments import DEFAULT_DIMENSIONS, group_counts
+from lead_quality.store import (AGGREGATES_DIR, STORE_PATH, load_cleaned, load_parts, part_names, read_manifest,
+                                store_exists, write_manifest)
+
+COUNT_COLUMNS = ['good_count', 'total_count', 'closed_count', 'bad_count']
+
+# 持久化分群汇总的维度
+SEGMENT_DIMENSIONS = DEFAULT_DIMENSIONS + ['state']
+
+# 汇总表名 -> 主键列
+AGGREGATE_KEYS = {
+    'daily': ['date'],
+    'weekly': ['week'],
+    'segments': ['dimension', 'segment'],
+}
+
+# 计算汇总表需要读取的列
+AGGREGATE_COLUMNS = ['date', 'week', 'is_good', 'is_closed', 'is_bad'] + SEGMENT_DIMENSIONS
+
+
+def _period_counts(df, key):
+    counts = df.groupby(key).agg(
+        good_count=('is_good', 'sum'),
+        total_count=('is_good', 'count'),
+        closed_count=('is_closed', 'sum'),
+        bad_count=('is_bad', 'sum'),
+    ).reset_index()
+    return counts
+
+
+def aggregate_counts(df):
+    """计算一批清洗后数据的日/周/分群计数"""
+    segments = [group_counts(df, dim) for dim in SEGMENT_DIMENSIONS if dim in df.columns]
+    segments = pd.concat(segments, ignore_index=True).rename(columns={'leads': 'total_count'})
+    return {
+        'daily': _period_counts(df, 'date'),
+        'weekly': _period_counts(df, 'week'),
+        'segments': segments[AGGREGATE_KEYS['segments'] + COUNT_COLUMNS],
+    }
+
+
+def _aggregates_dir(store_path):
+    return os.path.join(store_path, AGGREGATES_DIR)
+
+
+def load_aggregates(name, store_path=STORE_PATH):
+    """读取持久化的汇总表 (daily / weekly / segments)"""
+    directory = _aggregates_dir(store_path)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(directory)
+    return pd.read_parquet(os.path.join(directory, manifest['files'][name]))
+
+
+def current_aggregates(name, store_path=STORE_PATH):
+    """汇总表覆盖存储中的全部part时返回它, 否则 (还没建立, 或之后又写入了part) 返回 None"""
+    manifest = read_manifest(_aggregates_dir(store_path))
+    if manifest is None or manifest['parts'] != part_names(store_path):
+        return None
+    return load_aggregates(name, store_path)
+
+
+def _write_aggregates(aggregates, store_path, parts):
+    """写入新一代汇总表, 替换清单后再删除旧的一代"""
+    directory = _aggregates_dir(store_path)
+    os.makedirs(directory, exist_ok=True)
+    generation = (read_manifest(directory) or {}).get('generation', -1) + 1
+    files = {}
+    for name, table in aggregates.items():
+        files[name] = f'{name}-{generation:08d}.parquet'
+        table.to_parquet(os.path.join(directory, files[name]), index=False)
+    write_manifest(directory, {'generation': generation, 'parts': list(parts), 'files': files})
+    for file_path in glob.glob(os.path.join(directory, '*.parquet')):
+        if os.path.basename(file_path) not in files.values():
+            os.remove(file_path)
+
+
+def merge_aggregates(current, delta):
+    """把新增计数合并进已有汇总 (按主键相加); 分群保持首次出现的顺序, 与 segments.group_counts 一致"""
+    merged = {}
+    for name, keys in AGGREGATE_KEYS.items():
+        table = pd.concat([current[name], delta[name]], ignore_index=True)
+        merged[name] = table.groupby(keys, as_index=False, sort=name != 'segments')[COUNT_COLUMNS].sum()
+    return merged
+
+
+def rebuild_aggregates(store_path=STORE_PATH):
+    """从完整存储重建汇总表 (首次使用增量模式或全量重跑后)"""
+    parts = part_names(store_path)
+    aggregates = aggregate_counts(load_cleaned(columns=AGGREGATE_COLUMNS, path=store_path))
+    _write_aggregates(aggregates, store_path, parts)
+    return aggregates
+
+
+def update_aggregates(store_path=STORE_PATH):
+    """
+    让汇总表覆盖存储中的全部part: 只读取清单里没有的part (普通追加或中断的导入写入的) 并合并进去;
+    还没有汇总表, 或清单里的part已不在存储中 (存储被重写过) 时从完整存储重建
+    """
+    manifest = read_manifest(_aggregates_dir(store_path))
+    stored = part_names(store_path)
+    if manifest is None or not set(manifest['parts']) <= set(stored):
+        return rebuild_aggregates(store_path)
+    aggregates = {name: load_aggregates(name, store_path) for name in AGGREGATE_KEYS}
+    missing = [name for name in stored if name not in manifest['parts']]
+    if missing:
+        delta = aggregate_counts(load_parts(missing, columns=AGGREGATE_COLUMNS, path=store_path))
+        aggregates = merge_aggregates(aggregates, delta)
+        _write_aggregates(aggregates, store_path, stored)
+    return aggregates
+
+
+def ingest_delta(source, store_path=STORE_PATH, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    增量导入一批新leads (文件路径或DataFrame)
+    已导入过的VendorLeadID会被跳过, 新增行追加到存储; 每写入一个part就把它的计数合并进汇总表并提交
+    """
+    state = {'aggregates': None, 'parts': []}
+    if store_exists(store_path):
+        state['aggregates'] = update_aggregates(store_path)
+        state['parts'] = part_names(store_path)
+
+    def on_chunk(cleaned, part):
+        delta = aggregate_counts(cleaned)
+        if state['aggregates'] is not None:
+            delta = merge_aggregates(state['aggregates'], delta)
+        state['aggregates'] = delta
+        state['parts'].append(part)
+        _write_aggregates(delta, store_path, state['parts'])
+
+    return ingest(source, store_path=store_path, chunksize=chunksize, overwrite=False, on_chunk=on_chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量导入新一批leads')
+    parser.add_argument('file_path', nargs='?', help='csv / xlsx / xls 导出文件')
+    parser.add_argument('--store', default=STORE_PATH, help=f'存储路径 (默认 {STORE_PATH})')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='每块行数')
+    parser.add_argument('--rebuild', action='store_true', help='只从完整存储重建汇总表')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        aggregates = rebuild_aggregates(args.store)
+        print(f"已重建汇总表: {len(aggregates['daily'])} 天, {len(aggregates['segments'])} 个分群")
+        return
+    if not args.file_path or not os.path.exists(args.file_path):
+        print(f"错误: 找不到 {args.file_path}")
+        return
+    summary = ingest_delta(args.file_path, store_path=args.store, chunksize=args.chunksize)
+    print(f"读取 {summary['rows_read']:,} 行, 已存在 {summary['duplicates']:,} 行, "
+          f"新增 {summary['rows_written']:,} 行 -> {args.store}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+流式导入lead导出文件
+按行分块读取 CSV/xlsx, 跨块按VendorLeadID去重, 逐块清洗后追加到列式存储;
+峰值内存只和块大小有关
+
+用法:
+    python -m lead_quality.ingest leads_export.csv --chunksize 200000
+"""
+
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.cleaning import VENDOR_ID_COL, clean_leads
+from lead_quality.store import (SEEN_IDS_DIR, STORE_PATH, append_cleaned, clear_store, load_parts, part_names,
+                                read_manifest, write_manifest)
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class SeenIds:
+    """
+    已导入ID集合
+    只保存ID的64位哈希 (每个ID 8字节), 按大小分层的有序数组, 合并代价均摊为 O(n log n);
+    可以持久化到存储目录下, 增量导入时以内存映射方式打开, 不需要读取历史数据;
+    parts 为已经计入集合的part文件名, 和各层文件一起记在清单里
+    """
+
+    def __init__(self):
+        self._runs = []
+        self._files = []
+        self.parts = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    @staticmethod
+    def hash_ids(ids):
+        return pd.util.hash_array(np.asarray(ids, dtype=object))
+
+    @classmethod
+    def load(cls, path):
+        """
+        打开已持久化的ID集合, 各层以只读内存映射方式加载
+        没有清单的旧格式只在导入结束时保存, parts 记为 None, 由调用方按覆盖全部part处理
+        """
+        seen = cls()
+        manifest = read_manifest(path)
+        if manifest is not None:
+            files = [os.path.join(path, name) for name in manifest['runs']]
+            seen.parts = list(manifest['parts'])
+        else:
+            files = sorted(glob.glob(os.path.join(path, 'run-*.npy')))
+            seen.parts = None if files else []
+        for file_path in files:
+            seen._runs.append(np.load(file_path, mmap_mode='r'))
+            seen._files.append(file_path)
+        return seen
+
+    def save(self, path):
+        """只写入新产生的层, 替换清单后再删除已被合并掉 (或中断时留下) 的文件"""
+        os.makedirs(path, exist_ok=True)
+        existing = set(glob.glob(os.path.join(path, 'run-*.npy')))
+        next_index = max([int(os.path.basename(f)[4:12]) for f in existing], default=-1) + 1
+        for i, run in enumerate(self._runs):
+            if self._files[i] is None:
+                self._files[i] = os.path.join(path, f'run-{next_index:08d}.npy')
+                np.save(self._files[i], run)
+                next_index += 1
+        write_manifest(path, {'parts': self.parts, 'runs': [os.path.basename(f) for f in self._files]})
+        for file_path in existing - set(self._files):
+            os.remove(file_path)
+
+    def contains(self, hashes):
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            seen |= run[pos] == hashes
+        return seen
+
+    def add(self, hashes):
+        run = np.unique(hashes)
+        # 新run不小于上一个run时逐级合并, 保持run数量为 O(log n)
+        while self._runs and len(self._runs[-1]) <= len(run):
+            self._files.pop()
+            run = np.union1d(self._runs.pop(), run)
+        self._runs.append(run)
+        self._files.append(None)
+
+    def filter_new(self, ids):
+        """返回布尔掩码: 本块内第一次出现且之前没见过的ID为True, 并把它们记为已见"""
+        hashes = self.hash_ids(ids)
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        keep &= ~self.contains(hashes)
+        if keep.any():
+            self.add(hashes[keep])
+        return keep
+
+
+def open_seen_ids(store_path=STORE_PATH):
+    """
+    打开存储对应的ID集合
+    清单里没有的part (还没持久化过, 或上次导入写完part后中断) 从它们的VendorLeadID列补上
+    """
+    path = os.path.join(store_path, SEEN_IDS_DIR)
+    stored = part_names(store_path)
+    seen = SeenIds.load(path) if os.path.isdir(path) else SeenIds()
+    if seen.parts is None:
+        seen.parts = list(stored)
+    elif not set(seen.parts) <= set(stored):
+        # 清单里的part已不在存储中: 存储被重写过, 集合作废
+        seen = SeenIds()
+    missing = [name for name in stored if name not in seen.parts]
+    if missing:
+        seen.add(seen.hash_ids(load_parts(missing, columns=[VENDOR_ID_COL], path=store_path)[VENDOR_ID_COL]))
+        seen.parts.extend(missing)
+    return seen
+
+
+def _xls_row(sheet, row_index, datemode):
+    """xls单行取值: 日期单元格转datetime, 空单元格转None"""
+    import xlrd
+    values = []
+    for cell in sheet.row(row_index):
+        if cell.ctype == xlrd.XL_CELL_DATE:
+            values.append(xlrd.xldate_as_datetime(cell.value, datemode))
+        elif cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+            values.append(None)
+        else:
+            values.append(cell.value)
+    return values
+
+
+def _iter_excel_rows(file_path, chunksize):
+    """逐行读取Excel, 每攒够chunksize行产出一个DataFrame"""
+    if file_path.lower().endswith('.xls'):
+        # xlrd会把整个工作表读入内存, 只能逐块转换, 不能逐块解析
+        import xlrd
+        book = xlrd.open_workbook(file_path, on_demand=True)
+        sheet = book.sheet_by_index(0)
+        header = sheet.row_values(0)
+        rows = (_xls_row(sheet, i, book.datemode) for i in range(1, sheet.nrows))
+    else:
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunksize:
+            yield pd.DataFrame(batch, columns=header)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=header)
+
+
+def iter_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """按块读取原始导出文件 (csv / xlsx / xls), 也接受已在内存中的DataFrame"""
+    if isinstance(file_path, pd.DataFrame):
+        for start in range(0, len(file_path), chunksize):
+            yield file_path.iloc[start:start + chunksize]
+    elif file_path.lower().endswith('.csv'):
+        yield from pd.read_csv(file_path, chunksize=chunksize)
+    elif file_path.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+        yield from _iter_excel_rows(file_path, chunksize)
+    else:
+        raise ValueError(f"不支持的文件格式: {file_path}")
+
+
+def ingest(file_path, store_path=STORE_PATH, chunksize=DEFAULT_CHUNKSIZE, overwrite=True, on_chunk=None):
+    """
+    流式导入: 分块读取 -> 去重 -> 清洗 -> 追加写入存储
+    on_chunk(cleaned, part) 会收到每一块清洗后的数据和它写入的part文件名; 返回读取行数、重复行数和写入行数
+    每块写入后立即提交ID集合, 中断后重新导入同一文件时已写入的行按重复跳过
+    """
+    if overwrite:
+        clear_store(store_path)
+    seen = open_seen_ids(store_path)
+    seen_path = os.path.join(store_path, SEEN_IDS_DIR)
+
+    summary = {'rows_read': 0, 'duplicates': 0, 'rows_written': 0, 'chunks': 0}
+    for chunk in iter_chunks(file_path, chunksize):
+        n_rows = len(chunk)
+        chunk = chunk[seen.filter_new(chunk[VENDOR_ID_COL].to_numpy())]
+        summary['rows_read'] += n_rows
+        summary['duplicates'] += n_rows - len(chunk)
+        summary['chunks'] += 1
+        if len(chunk) == 0:
+            continue
+        cleaned = clean_leads(chunk)
+        part = append_cleaned(cleaned, path=store_path)
+        if on_chunk is not None:
+            on_chunk(cleaned, part)
+        seen.parts.append(part)
+        seen.save(seen_path)
+        summary['rows_written'] += len(chunk)
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流式导入lead导出文件到清洗后存储')
+    parser.add_argument('file_path', help='csv / xlsx / xls 导出文件')
+    parser.add_argument('--store', default=STORE_PATH, help=f'存储路径 (默认 {STORE_PATH})')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='每块行数')
+    parser.add_argument('--append', action='store_true', help='追加到已有存储, 而不是覆盖')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file_path):
+        print(f"错误: 找不到 {args.file_path}")
+        return
+    summary = ingest(args.file_path, store_path=args.store, chunksize=args.chunksize,
+                     overwrite=not args.append)
+    print(f"读取 {summary['rows_read']:,} 行 ({summary['chunks']} 块), "
+          f"去重 {summary['duplicates']:,} 行, 写入 {summary['rows_written']:,} 行 -> {args.store}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+阶段级度量
+stage() 上下文管理器和 instrumented 装饰器包住流水线的各个阶段 (加载数据、各节点、渲染函数),
+记录墙钟时间、CPU时间、峰值RSS、输入/输出行数, 每个阶段一行JSON写入度量文件;
+可以为每个阶段单独保存 cProfile 结果. 默认关闭, 关闭时 stage() 返回共享的空上下文,
+装饰器只多一次全局变量判断
+
+用法:
+    python3 generate_report.py --metrics metrics.jsonl --profile profiles/
+    python -c "import pstats; pstats.Stats('profiles/<run_id>/<文件>.prof').sort_stats('cumtime').print_stats(20)"
+"""
+
+import functools
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+# 开启时为 _Recorder, 关闭时为 None
+_RECORDER = None
+
+
+def count_rows(value):
+    """DataFrame / Series / 数组的行数, 列表的长度; 其他对象返回 None"""
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+
+def _max_rss_mb():
+    """进程至今的峰值常驻内存; Windows 上没有 resource 模块, 返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是KB, macOS 上是字节
+    return rss / 1e6 if platform.system() == 'Darwin' else rss / 1e3
+
+
+class _NullStage:
+    """关闭时所有阶段共用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def record(self, **fields):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, recorder, name, fields):
+        self.recorder = recorder
+        self.name = name
+        self.fields = fields
+        self.profiler = None
+
+    def record(self, **fields):
+        """补充本阶段的字段, 如 rows_out"""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = self.recorder.stack
+        self.parent = stack[-1].name if stack else None
+        self.depth = len(stack)
+        if self.recorder.profile_dir is not None:
+            import cProfile
+            # 同一时刻只能有一个 profiler 生效: 暂停外层阶段的, 各阶段的结果只含自身 (不含内层阶段)
+            if stack and stack[-1].profiler is not None:
+                stack[-1].profiler.disable()
+            self.profiler = cProfile.Profile()
+        stack.append(self)
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self.rss_before = _max_rss_mb()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        max_rss = _max_rss_mb()
+        stack = self.recorder.stack
+        stack.pop()
+        if stack and stack[-1].profiler is not None:
+            stack[-1].profiler.enable()
+
+        record = {
+            'run_id': self.recorder.run_id,
+            'pid': os.getpid(),
+            'stage': self.name,
+            'parent': self.parent,
+            'depth': self.depth,
+            'started_at': self.started_at,
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'max_rss_mb': max_rss,
+            # 本阶段把进程峰值RSS推高了多少; 0 表示没有超过之前的峰值
+            'max_rss_growth_mb': None if max_rss is None else round(max_rss - self.rss_before, 3),
+            'rows_in': None,
+            'rows_out': None,
+            **self.fields,
+        }
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.profiler is not None:
+            record['profile'] = self.recorder.dump_profile(self.profiler, self.name)
+        self.recorder.emit(record)
+        return False
+
+
+class _Recorder:
+    def __init__(self, metrics_path=None, profile_dir=None, run_id=None):
+        self.metrics_path = metrics_path
+        self.profile_dir = profile_dir
+        self.run_id = run_id or f'{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}'
+        self.stack = []
+        self.records = []
+        self._profiles = 0
+
+    def emit(self, record):
+        self.records.append(record)
+        if self.metrics_path is None:
+            return
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        if self.metrics_path == '-':
+            sys.stderr.write(line)
+        else:
+            # 每行单独追加, 并行渲染的子进程可以写同一个文件
+            with open(self.metrics_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def dump_profile(self, profiler, name):
+        self._profiles += 1
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        directory = os.path.join(self.profile_dir, self.run_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self._profiles:03d}-{safe_name}-{os.getpid()}.prof')
+        profiler.dump_stats(path)
+        return path
+
+
+def configure(metrics_path=None, profile_dir=None, run_id=None):
+    """
+    开启度量: metrics_path 为JSON lines文件 ('-' 写到标准错误, None 只保存在内存中, 见 records());
+    profile_dir 给出时每个阶段的 cProfile 结果存为 profile_dir/<run_id>/ 下的 .prof 文件
+    """
+    global _RECORDER
+    _RECORDER = _Recorder(metrics_path, profile_dir, run_id)
+    return _RECORDER
+
+
+def disable():
+    global _RECORDER
+    _RECORDER = None
+
+
+def enabled():
+    return _RECORDER is not None
+
+
+def settings():
+    """当前配置, 传给子进程的 configure 后记录到同一个文件和同一个 run_id; 关闭时为 None"""
+    if _RECORDER is None:
+        return None
+    return {'metrics_path': _RECORDER.metrics_path, 'profile_dir': _RECORDER.profile_dir,
+            'run_id': _RECORDER.run_id}
+
+
+def records():
+    """本进程已记录的阶段"""
+    return [] if _RECORDER is None else list(_RECORDER.records)
+
+
+def stage(name, rows_in=None, **fields):
+    """
+    度量一个阶段: with stage('load_data') as s: ...; s.record(rows_out=len(df))
+    fields 是写入记录的附加字段
+    """
+    if _RECORDER is None:
+        return _NULL_STAGE
+    return _Stage(_RECORDER, name, {'rows_in': rows_in, **fields})
+
+
+def instrumented(name=None, **fields):
+    """装饰器: 函数作为一个阶段, 输入行数取第一个能计数的参数, 输出行数取返回值"""
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _RECORDER is None:
+                return func(*args, **kwargs)
+            rows_in = next((rows for rows in map(count_rows, [*args, *kwargs.values()]) if rows is not None), None)
+            with stage(stage_name, rows_in=rows_in, **fields) as current:
+                result = func(*args, **kwargs)
+                current.record(rows_out=count_rows(result))
+            return result
+        return wrapper
+    return decorate
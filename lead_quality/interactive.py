@@ -0,0 +1,501 @@
+"""
+交互式HTML报告
+把流水线节点的汇总结果 (日序列、分群表、砍尾巴曲线、情景和bootstrap达标概率) 压缩成一份JSON
+嵌入 index.html, 图表由页内的小脚本在浏览器中用SVG绘制, 表格可以排序和筛选;
+页面不引用任何外部资源, 离线可用. 体积只和天数、分群数有关, 与leads总数无关
+(分群最多保留 MAX_SEGMENTS 个, 按leads从多到少)
+
+用法:
+    python3 generate_report.py render --interactive
+"""
+
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lead_quality import instrument
+
+MAX_SEGMENTS = 2000
+# 比率保留的小数位数 (0.0001%)
+RATE_DIGITS = 6
+
+DAILY_COLUMNS = ['date', 'total_count', 'good_count', 'GoodQualityRate', 'CloseRate', 'BadRate',
+                 'GoodQualityRate_ci_lower', 'GoodQualityRate_ci_upper', 'GoodQualityRate_7d', 'CloseRate_7d',
+                 'BadRate_7d']
+SEGMENT_COLUMNS = ['dimension', 'segment', 'leads', 'rate', 'close_rate', 'bad_rate', 'lift', 'ci_lower',
+                   'ci_upper', 'p_adjusted', 'significant']
+SCENARIO_COLUMNS = ['name', 'new_rate', 'volume_drop', 'reached_target', 'rate_ci_lower', 'rate_ci_upper',
+                    'p_reach_target', 'replicates']
+
+
+def _value(value, digits=RATE_DIGITS):
+    """numpy / pandas 标量转成JSON能表示的值, NaN 为 None"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), digits)
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _columns(table, columns, digits=RATE_DIGITS):
+    """DataFrame 的若干列按列存成列表 (比逐行的对象省掉重复的键名)"""
+    out = {}
+    for col in columns:
+        values = table[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            out[col] = values.dt.strftime('%Y-%m-%d').tolist()
+        elif pd.api.types.is_float_dtype(values):
+            out[col] = [None if np.isnan(v) else v for v in values.round(digits).tolist()]
+        else:
+            out[col] = [_value(v, digits) for v in values.tolist()]
+    return out
+
+
+def _scenario_table(scenarios, uncertainty, target_rate):
+    """情景列表与bootstrap结果按名称合并; 只在bootstrap中出现的情景 (Scenario B) 也保留"""
+    table = pd.DataFrame(scenarios, columns=['name', 'new_rate', 'reached_target', 'volume_drop'])
+    if uncertainty is not None and len(uncertainty):
+        reach = uncertainty.rename(columns={'scenario': 'name', 'new_rate': 'bootstrap_new_rate'})
+        table = table.merge(reach, on='name', how='outer', sort=False)
+        table['new_rate'] = table['new_rate'].fillna(table['bootstrap_new_rate'])
+    for col in SCENARIO_COLUMNS:
+        if col not in table.columns:
+            table[col] = np.nan
+    table['new_rate'] = table['new_rate'].astype(float)
+    table['reached_target'] = table['new_rate'] >= target_rate
+    return table
+
+
+@instrument.instrumented('interactive_data', kind='render')
+def report_data(pipeline, max_segments=MAX_SEGMENTS):
+    """页面嵌入的数据: 只含汇总结果, 日序列按天、分群表按分群、曲线固定 0.1% 步长"""
+    baseline, trend = pipeline['baseline'], pipeline['trend']
+    target_rate = pipeline.params['target_rate']
+    segments = pipeline['segment_table']
+    if len(segments) > max_segments:
+        segments = segments.nlargest(max_segments, 'leads')
+    best = pipeline['best_scenario']
+    scenarios = _scenario_table(pipeline['scenarios'], pipeline['scenario_uncertainty'], target_rate)
+
+    return {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'target_rate': target_rate,
+        'baseline': {key: _value(value) for key, value in baseline.items()},
+        'trend': {
+            'change_direction': trend['change_direction'],
+            'significant': _value(trend['significant']),
+            'p_value': _value(min(trend['p_value_ztest'], trend['p_value_logistic'])),
+            'first_half_rate': _value(trend['first_half_rate']),
+            'second_half_rate': _value(trend['second_half_rate']),
+            'change_pct': _value(trend['change_pct'], 2),
+        },
+        'daily': _columns(pipeline['daily_stats'], DAILY_COLUMNS),
+        'segments': _columns(segments, SEGMENT_COLUMNS),
+        'segments_total': len(pipeline['segment_table']),
+        'curve': _columns(pipeline['cut_tail_curve'], ['cut_pct', 'new_rate', 'remaining_volume']),
+        'cut_tail': _columns(pipeline['cut_tail'], ['cut_pct', 'new_rate']),
+        'scenarios': _columns(scenarios, SCENARIO_COLUMNS),
+        'best_scenario': best['name'] if best else None,
+    }
+
+
+def _embed(data):
+    """紧凑的JSON; 转义 '</' 以免提前结束 <script> 标签"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False).replace('</', '<\\/')
+
+
+@instrument.instrumented('render_interactive_html', kind='render')
+def render_interactive_html(data):
+    return _PAGE.replace('__STYLE__', _STYLE).replace('__SCRIPT__', _SCRIPT).replace('__DATA__', _embed(data))
+
+
+def write_interactive_report(pipeline, path='index.html', max_segments=MAX_SEGMENTS):
+    """写出交互式报告, 返回文件大小 (字节)"""
+    content = render_interactive_html(report_data(pipeline, max_segments=max_segments)).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(content)
+    return len(content)
+
+
+_STYLE = """
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Microsoft YaHei', Arial, sans-serif;
+       line-height: 1.6; color: #333; background: #f5f5f5; padding: 20px; }
+.container { max-width: 1200px; margin: 0 auto; background: white; padding: 40px;
+             box-shadow: 0 2px 10px rgba(0,0,0,0.1); border-radius: 8px; }
+h1 { color: #2c3e50; border-bottom: 4px solid #3498db; padding-bottom: 10px; margin-bottom: 10px; }
+h2 { color: #34495e; margin: 40px 0 16px; padding-left: 10px; border-left: 4px solid #3498db; }
+p { margin: 8px 0; }
+.muted { color: #7f8c8d; font-size: 0.9em; }
+.cards { display: grid; grid-template-columns: repeat(auto-fit, minmax(170px, 1fr)); gap: 12px; margin: 20px 0; }
+.card { background: #f8f9fa; border-left: 4px solid #3498db; padding: 12px 15px; border-radius: 4px; }
+.card .label { color: #7f8c8d; font-size: 0.85em; }
+.card .value { color: #2c3e50; font-size: 1.25em; font-weight: bold; word-break: break-word; }
+.controls { display: flex; flex-wrap: wrap; gap: 10px; align-items: center; margin: 10px 0; }
+.controls input, .controls select { padding: 4px 8px; border: 1px solid #ccc; border-radius: 4px; }
+.controls button { padding: 4px 12px; border: 1px solid #3498db; background: white; color: #3498db;
+                   border-radius: 4px; cursor: pointer; }
+.controls button.active { background: #3498db; color: white; }
+svg.chart { width: 100%; height: auto; display: block; font-size: 12px; fill: #555; }
+svg.chart .grid { stroke: #ecf0f1; }
+svg.chart .cursor { stroke: #7f8c8d; stroke-dasharray: 3 3; }
+svg.chart .whisker { stroke: #2c3e50; stroke-width: 1.2; }
+.legend { display: flex; flex-wrap: wrap; gap: 16px; font-size: 0.85em; color: #555; margin: 4px 0 12px 60px; }
+.legend i { display: inline-block; width: 12px; height: 12px; margin-right: 5px; vertical-align: -1px; }
+.table-wrap { max-height: 480px; overflow: auto; margin: 10px 0; }
+.data-table { width: 100%; border-collapse: collapse; font-size: 0.9em; }
+.data-table th { position: sticky; top: 0; background: #3498db; color: white; padding: 8px 10px; text-align: left;
+                 cursor: pointer; user-select: none; white-space: nowrap; }
+.data-table th.asc::after { content: ' \\25B2'; }
+.data-table th.desc::after { content: ' \\25BC'; }
+.data-table td { padding: 6px 10px; border-bottom: 1px solid #eee; }
+.data-table td.num { text-align: right; font-variant-numeric: tabular-nums; white-space: nowrap; }
+.data-table tbody tr:hover { background: #f1f8ff; }
+.tip { position: absolute; display: none; background: rgba(44,62,80,0.92); color: white; padding: 6px 10px;
+       border-radius: 4px; font-size: 12px; white-space: pre; pointer-events: none; }
+"""
+
+_SCRIPT = r"""
+(function () {
+  var D = JSON.parse(document.getElementById('report-data').textContent);
+  var SVG = 'http://www.w3.org/2000/svg';
+
+  function make(node, attrs, parent, text) {
+    for (var k in attrs || {}) node.setAttribute(k, attrs[k]);
+    if (text != null) node.textContent = text;
+    if (parent) parent.appendChild(node);
+    return node;
+  }
+  function el(tag, attrs, parent, text) { return make(document.createElement(tag), attrs, parent, text); }
+  function sv(tag, attrs, parent, text) { return make(document.createElementNS(SVG, tag), attrs, parent, text); }
+  function $(id) { return document.getElementById(id); }
+  function pct(v, d) { return v == null ? '–' : (v * 100).toFixed(d == null ? 2 : d) + '%'; }
+  function num(v, d) { return v == null ? '–' : Number(v).toFixed(d == null ? 2 : d); }
+  function int(v) { return v == null ? '–' : Number(v).toLocaleString('en-US'); }
+  function records(cols) {
+    var keys = Object.keys(cols), n = keys.length ? cols[keys[0]].length : 0, out = [];
+    for (var i = 0; i < n; i++) {
+      var r = {};
+      keys.forEach(function (k) { r[k] = cols[k][i]; });
+      out.push(r);
+    }
+    return out;
+  }
+  function extent(values) {
+    var lo = Infinity, hi = -Infinity;
+    values.forEach(function (v) { if (v != null) { lo = Math.min(lo, v); hi = Math.max(hi, v); } });
+    return lo > hi ? [0, 1] : lo === hi ? [lo - 1, hi + 1] : [lo, hi];
+  }
+  function ticks(lo, hi, n) {
+    var step = (hi - lo) / n, p = Math.pow(10, Math.floor(Math.log(step) / Math.LN10)), e = step / p, out = [];
+    step = (e > 5 ? 10 : e > 2 ? 5 : e > 1 ? 2 : 1) * p;
+    for (var t = Math.ceil(lo / step) * step; t <= hi + step * 1e-9; t += step) out.push(t);
+    return out;
+  }
+
+  var tip = el('div', {'class': 'tip'}, document.body);
+  function showTip(evt, text) {
+    tip.textContent = text;
+    tip.style.display = 'block';
+    tip.style.left = (evt.pageX + 14) + 'px';
+    tip.style.top = (evt.pageY + 14) + 'px';
+  }
+  function hideTip() { tip.style.display = 'none'; }
+
+  function legend(box, items) {
+    var row = el('div', {'class': 'legend'}, box);
+    items.forEach(function (s) {
+      if (!s || !s.label) return;
+      var item = el('span', null, row);
+      el('i', {style: 'background:' + s.color}, item);
+      item.appendChild(document.createTextNode(s.label));
+    });
+  }
+
+  function lineChart(box, o) {
+    box.textContent = '';
+    var W = 900, H = 300, m = {l: 60, r: 20, t: 12, b: 30};
+    var svg = sv('svg', {viewBox: '0 0 ' + W + ' ' + H, 'class': 'chart'}, box);
+    var xs = [], ys = [];
+    o.series.forEach(function (s) { xs = xs.concat(s.x); ys = ys.concat(s.y); });
+    if (o.band) ys = ys.concat(o.band.lo, o.band.hi);
+    (o.hlines || []).forEach(function (h) { ys.push(h.y); });
+    var xr = extent(xs), yr = extent(ys), pad = (yr[1] - yr[0]) * 0.05;
+    var x0 = xr[0], x1 = xr[1], y0 = yr[0] >= 0 ? Math.max(yr[0] - pad, 0) : yr[0] - pad, y1 = yr[1] + pad;
+    function X(v) { return m.l + (v - x0) / (x1 - x0) * (W - m.l - m.r); }
+    function Y(v) { return H - m.b - (v - y0) / (y1 - y0) * (H - m.t - m.b); }
+
+    ticks(y0, y1, 5).forEach(function (t) {
+      sv('line', {x1: m.l, x2: W - m.r, y1: Y(t), y2: Y(t), 'class': 'grid'}, svg);
+      sv('text', {x: m.l - 6, y: Y(t) + 4, 'text-anchor': 'end'}, svg, o.yfmt(t));
+    });
+    ticks(x0, x1, 6).forEach(function (t) {
+      sv('text', {x: X(t), y: H - m.b + 18, 'text-anchor': 'middle'}, svg, o.xfmt(t));
+    });
+    if (o.band) {
+      var upper = [], lower = [];
+      o.band.x.forEach(function (x, i) {
+        if (o.band.lo[i] == null || o.band.hi[i] == null) return;
+        upper.push(X(x).toFixed(1) + ',' + Y(o.band.hi[i]).toFixed(1));
+        lower.unshift(X(x).toFixed(1) + ',' + Y(o.band.lo[i]).toFixed(1));
+      });
+      sv('polygon', {points: upper.concat(lower).join(' '), fill: o.band.color, opacity: 0.18}, svg);
+    }
+    (o.hlines || []).forEach(function (h) {
+      sv('line', {x1: m.l, x2: W - m.r, y1: Y(h.y), y2: Y(h.y), stroke: h.color, 'stroke-dasharray': '6 4'}, svg);
+      sv('text', {x: W - m.r - 4, y: Y(h.y) - 5, 'text-anchor': 'end', fill: h.color}, svg, h.label);
+    });
+    o.series.forEach(function (s) {
+      var opacity = s.opacity || 1;
+      if (s.line !== false) {
+        var d = '', pen = 'M';
+        s.x.forEach(function (x, i) {
+          if (s.y[i] == null) { pen = 'M'; return; }
+          d += pen + X(x).toFixed(1) + ' ' + Y(s.y[i]).toFixed(1);
+          pen = 'L';
+        });
+        sv('path', {d: d, fill: 'none', stroke: s.color, 'stroke-width': s.width || 1.5, opacity: opacity}, svg);
+      }
+      if (s.dots) {
+        s.x.forEach(function (x, i) {
+          if (s.y[i] != null) sv('circle', {cx: X(x), cy: Y(s.y[i]), r: s.dots, fill: s.color, opacity: opacity}, svg);
+        });
+      }
+    });
+
+    if (o.tip) {
+      var at = o.series[0].x, cursor = sv('line', {y1: m.t, y2: H - m.b, 'class': 'cursor'}, svg);
+      cursor.style.display = 'none';
+      var hit = sv('rect', {x: m.l, y: m.t, width: W - m.l - m.r, height: H - m.t - m.b, fill: 'transparent'}, svg);
+      hit.addEventListener('mousemove', function (evt) {
+        var r = svg.getBoundingClientRect();
+        var v = x0 + ((evt.clientX - r.left) / r.width * W - m.l) / (W - m.l - m.r) * (x1 - x0);
+        var lo = 0, hi = at.length - 1;
+        while (lo < hi) {
+          var mid = (lo + hi) >> 1;
+          if (at[mid] < v) lo = mid + 1; else hi = mid;
+        }
+        if (lo > 0 && v - at[lo - 1] < at[lo] - v) lo -= 1;
+        cursor.setAttribute('x1', X(at[lo]));
+        cursor.setAttribute('x2', X(at[lo]));
+        cursor.style.display = '';
+        showTip(evt, o.tip(lo));
+      });
+      hit.addEventListener('mouseleave', function () { cursor.style.display = 'none'; hideTip(); });
+    }
+    legend(box, o.series.concat([o.band]));
+  }
+
+  function barChart(box, rows, baseline) {
+    box.textContent = '';
+    if (!rows.length) { el('p', {'class': 'muted'}, box, '没有符合条件的分群'); return; }
+    var W = 900, rowH = 22, m = {l: 320, r: 70, t: 8, b: 8}, H = m.t + m.b + rowH * rows.length;
+    var svg = sv('svg', {viewBox: '0 0 ' + W + ' ' + H, 'class': 'chart'}, box);
+    var max = extent(rows.map(function (r) { return r.ci_upper == null ? r.rate : r.ci_upper; }).concat([baseline]))[1];
+    function X(v) { return m.l + Math.max(v, 0) / max * (W - m.l - m.r); }
+    rows.forEach(function (r, i) {
+      var y = m.t + i * rowH, label = r.segment + ' (' + r.dimension + ')';
+      sv('text', {x: m.l - 8, y: y + rowH / 2 + 4, 'text-anchor': 'end'}, svg,
+         label.length > 48 ? label.slice(0, 47) + '…' : label);
+      var bar = sv('rect', {x: m.l, y: y + 3, width: X(r.rate) - m.l, height: rowH - 6,
+                            fill: r.rate >= baseline ? '#2ecc71' : '#e74c3c'}, svg);
+      if (r.ci_lower != null) {
+        sv('line', {x1: X(r.ci_lower), x2: X(r.ci_upper), y1: y + rowH / 2, y2: y + rowH / 2, 'class': 'whisker'}, svg);
+      }
+      sv('text', {x: W - m.r + 6, y: y + rowH / 2 + 4}, svg, pct(r.rate));
+      bar.addEventListener('mousemove', function (evt) {
+        showTip(evt, label + '\nGoodQualityRate: ' + pct(r.rate) + '\n95% CI: ' + pct(r.ci_lower) + ' – ' +
+                pct(r.ci_upper) + '\nLift: ' + num(r.lift) + 'x\nLeads: ' + int(r.leads));
+      });
+      bar.addEventListener('mouseleave', hideTip);
+    });
+    sv('line', {x1: X(baseline), x2: X(baseline), y1: m.t, y2: H - m.b, stroke: '#34495e', 'stroke-dasharray': '6 4'}, svg);
+  }
+
+  function sortableTable(box, columns, key, onRender) {
+    var state = {key: key, desc: true, rows: []};
+    var table = el('table', {'class': 'data-table'}, box);
+    var head = el('tr', null, el('thead', null, table)), body = el('tbody', null, table);
+    columns.forEach(function (c) {
+      c.th = el('th', null, head, c.label);
+      c.th.addEventListener('click', function () {
+        state.desc = state.key === c.key ? !state.desc : c.text !== true;
+        state.key = c.key;
+        render();
+      });
+    });
+    function render() {
+      var sign = state.desc ? -1 : 1, k = state.key;
+      state.rows.sort(function (a, b) {
+        var va = a[k], vb = b[k];
+        if (va == null || vb == null) return (va == null) - (vb == null);
+        return (va < vb ? -1 : va > vb ? 1 : 0) * sign;
+      });
+      columns.forEach(function (c) { c.th.className = c.key === k ? (state.desc ? 'desc' : 'asc') : ''; });
+      body.textContent = '';
+      state.rows.forEach(function (r) {
+        var tr = el('tr', null, body);
+        columns.forEach(function (c) {
+          el('td', c.text ? null : {'class': 'num'}, tr, c.fmt ? c.fmt(r[c.key], r) : r[c.key]);
+        });
+      });
+      if (onRender) onRender(state.rows);
+    }
+    return {update: function (rows) { state.rows = rows.slice(); render(); }};
+  }
+
+  var B = D.baseline, T = D.trend;
+  $('meta').textContent = '数据规模: ' + int(B.all_leads) + ' leads · 报告生成日期: ' + D.generated_at;
+  [['基线 GoodQualityRate', pct(B.GoodQualityRate)], ['CloseRate', pct(B.CloseRate)], ['BadRate', pct(B.BadRate)],
+   ['趋势', T.change_direction + (T.significant ? ' (显著' : ' (不显著') + ', p = ' + num(T.p_value, 4) + ')'],
+   ['目标 ' + pct(D.target_rate, 1), D.best_scenario ? '✓ ' + D.best_scenario : '✗ 现有情景均未达到']
+  ].forEach(function (c) {
+    var card = el('div', {'class': 'card'}, $('cards'));
+    el('div', {'class': 'label'}, card, c[0]);
+    el('div', {'class': 'value'}, card, c[1]);
+  });
+
+  var daily = D.daily, days = daily.date.map(function (d) { return Date.parse(d) / 864e5; });
+  var METRICS = {GoodQualityRate: '#3498db', CloseRate: '#9b59b6', BadRate: '#e74c3c'};
+  function drawTrend(metric) {
+    var ci = metric === 'GoodQualityRate';
+    lineChart($('trend-chart'), {
+      series: [{x: days, y: daily[metric], color: METRICS[metric], dots: 2.5, width: 1, opacity: 0.55, label: '日值'},
+               {x: days, y: daily[metric + '_7d'], color: '#e67e22', width: 2.5, label: '7日滚动均值'}],
+      band: ci ? {x: days, lo: daily.GoodQualityRate_ci_lower, hi: daily.GoodQualityRate_ci_upper,
+                  color: METRICS[metric], label: '95% CI'} : null,
+      hlines: [{y: B[metric], label: '整体 ' + pct(B[metric]), color: '#34495e'}],
+      xfmt: function (t) { return new Date(Math.round(t) * 864e5).toISOString().slice(0, 10); },
+      yfmt: function (v) { return pct(v, 1); },
+      tip: function (i) {
+        return daily.date[i] + '\n' + metric + ': ' + pct(daily[metric][i]) + '\n7日均值: ' +
+          pct(daily[metric + '_7d'][i]) + (ci ? '\n95% CI: ' + pct(daily.GoodQualityRate_ci_lower[i]) + ' – ' +
+          pct(daily.GoodQualityRate_ci_upper[i]) : '') + '\nLeads: ' + int(daily.total_count[i]);
+      }
+    });
+  }
+  Object.keys(METRICS).forEach(function (metric) {
+    var button = el('button', {type: 'button'}, $('trend-metric'), metric);
+    button.addEventListener('click', function () {
+      [].forEach.call($('trend-metric').children, function (b) { b.className = b === button ? 'active' : ''; });
+      drawTrend(metric);
+    });
+  });
+  $('trend-metric').children[0].click();
+  $('trend-text').textContent = '前1/2 GoodQualityRate ' + pct(T.first_half_rate) + ' → 后1/2 ' +
+    pct(T.second_half_rate) + ' (' + num(T.change_pct) + '% 相对变化)';
+
+  var segments = records(D.segments), seen = {};
+  D.segments.dimension.forEach(function (dim) {
+    if (!seen[dim]) { seen[dim] = true; el('option', {value: dim}, $('seg-dim'), dim); }
+  });
+  var segTable = sortableTable($('seg-table'), [
+    {key: 'dimension', label: 'Dimension', text: true},
+    {key: 'segment', label: 'Segment', text: true},
+    {key: 'leads', label: 'Leads', fmt: int},
+    {key: 'rate', label: 'GoodQualityRate', fmt: function (v) { return pct(v); }},
+    {key: 'ci_lower', label: '95% CI', fmt: function (v, r) { return pct(r.ci_lower) + ' – ' + pct(r.ci_upper); }},
+    {key: 'lift', label: 'Lift', fmt: function (v) { return v == null ? '–' : num(v) + 'x'; }},
+    {key: 'close_rate', label: 'CloseRate', fmt: function (v) { return pct(v); }},
+    {key: 'bad_rate', label: 'BadRate', fmt: function (v) { return pct(v); }},
+    {key: 'p_adjusted', label: 'p (BH校正)', fmt: function (v) { return num(v, 4); }},
+    {key: 'significant', label: '显著', fmt: function (v) { return v ? '✓' : ''; }}
+  ], 'rate', function (rows) {
+    barChart($('seg-chart'), rows.slice(0, 20), B.GoodQualityRate);
+    $('seg-count').textContent = rows.length + ' / ' + segments.length + ' 个分群' +
+      (D.segments_total > segments.length ? ' (只含leads最多的 ' + segments.length + ' 个, 共 ' +
+       D.segments_total + ' 个)' : '');
+  });
+  function filterSegments() {
+    var q = $('seg-search').value.trim().toLowerCase(), dim = $('seg-dim').value;
+    var min = Number($('seg-min').value) || 0, sig = $('seg-sig').checked;
+    segTable.update(segments.filter(function (r) {
+      return (!dim || r.dimension === dim) && r.leads >= min && (!sig || r.significant) &&
+        (!q || (r.segment + ' ' + r.dimension).toLowerCase().indexOf(q) >= 0);
+    }));
+  }
+  ['seg-search', 'seg-dim', 'seg-min', 'seg-sig'].forEach(function (id) {
+    $(id).addEventListener('input', filterSegments);
+    $(id).addEventListener('change', filterSegments);
+  });
+  filterSegments();
+
+  $('q3-title').textContent = 'Q3: 能否达到' + pct(D.target_rate, 1) + '目标？';
+  var curve = D.curve;
+  lineChart($('scenario-chart'), {
+    series: [{x: curve.cut_pct, y: curve.new_rate, color: '#34495e', width: 2, label: '砍掉最差X%流量后的质量 (0.1%步长)'},
+             {x: D.cut_tail.cut_pct, y: D.cut_tail.new_rate, color: '#3498db', dots: 5, line: false,
+              label: 'Scenario A'}],
+    hlines: [{y: D.target_rate, label: '目标 ' + pct(D.target_rate, 1), color: '#27ae60'},
+             {y: B.GoodQualityRate, label: '基线 ' + pct(B.GoodQualityRate), color: '#95a5a6'}],
+    xfmt: function (v) { return +v.toFixed(1) + '%'; },
+    yfmt: function (v) { return pct(v, 1); },
+    tip: function (i) {
+      return '砍掉 ' + curve.cut_pct[i] + '%\n新质量: ' + pct(curve.new_rate[i]) + '\n剩余量: ' +
+        int(curve.remaining_volume[i]);
+    }
+  });
+  sortableTable($('scenario-table'), [
+    {key: 'name', label: '情景', text: true},
+    {key: 'new_rate', label: '新质量', fmt: function (v) { return pct(v); }},
+    {key: 'rate_ci_lower', label: '95% 区间 (bootstrap)', fmt: function (v, r) {
+      return v == null ? '–' : pct(r.rate_ci_lower) + ' – ' + pct(r.rate_ci_upper);
+    }},
+    {key: 'volume_drop', label: 'Volume下降', fmt: function (v) { return v == null ? '–' : num(v, 1) + '%'; }},
+    {key: 'p_reach_target', label: '达标概率', fmt: function (v) { return pct(v, 1); }},
+    {key: 'reached_target', label: '达到目标', fmt: function (v) { return v ? '✓' : '✗'; }}
+  ], 'new_rate').update(records(D.scenarios));
+  var replicates = D.scenarios.replicates.filter(function (v) { return v != null; });
+  if (replicates.length) $('scenario-note').textContent = '达标概率: ' + int(replicates[0]) + ' 次bootstrap重抽样中新质量不低于目标的比例';
+})();
+"""
+
+_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Lead Quality Analysis - Executive Summary</title>
+<style>__STYLE__</style>
+</head>
+<body>
+<div class="container">
+<h1>Lead Quality Analysis - Executive Summary</h1>
+<p class="muted" id="meta"></p>
+<div class="cards" id="cards"></div>
+
+<h2>Q1: Lead质量趋势</h2>
+<div class="controls" id="trend-metric"></div>
+<div id="trend-chart"></div>
+<p id="trend-text"></p>
+
+<h2>Q2: 驱动因素与分群</h2>
+<div class="controls">
+<input id="seg-search" type="search" placeholder="搜索分群">
+<select id="seg-dim"><option value="">全部维度</option></select>
+<label>最少leads <input id="seg-min" type="number" min="0" value="0" style="width: 90px"></label>
+<label><input id="seg-sig" type="checkbox"> 只看显著</label>
+<span class="muted" id="seg-count"></span>
+</div>
+<p class="muted">点击表头排序; 图中为表格当前顺序的前20个分群, 虚线为基线, 横线为95% CI</p>
+<div id="seg-chart"></div>
+<div class="table-wrap" id="seg-table"></div>
+
+<h2 id="q3-title">Q3: 能否达到目标？</h2>
+<div id="scenario-chart"></div>
+<div class="table-wrap" id="scenario-table"></div>
+<p class="muted" id="scenario-note"></p>
+</div>
+<script id="report-data" type="application/json">__DATA__</script>
+<script>__SCRIPT__</script>
+</body>
+</html>
+"""
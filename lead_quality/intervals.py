@@ -0,0 +1,51 @@
+"""
+比例置信区间 (向量化)
+对整列 count/nobs 一次算出上下界, 支持 normal / wilson / clopper-pearson
+"""
+
+import numpy as np
+
+CI_METHODS = ('normal', 'wilson', 'clopper-pearson')
+
+
+def proportion_ci(count, nobs, alpha=0.05, method='normal'):
+    """
+    计算比例的置信区间
+    count/nobs 可以是标量或数组; nobs为0的位置返回 (0, 0)
+    """
+    from scipy import stats
+    count = np.asarray(count, dtype=np.float64)
+    nobs = np.asarray(nobs, dtype=np.float64)
+    empty = nobs == 0
+    z = stats.norm.ppf(1 - alpha / 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = count / nobs
+        if method == 'normal':
+            se = np.sqrt(p * (1 - p) / nobs)
+            lower = np.maximum(0, p - z * se)
+            upper = np.minimum(1, p + z * se)
+        elif method == 'wilson':
+            denom = 1 + z ** 2 / nobs
+            center = (p + z ** 2 / (2 * nobs)) / denom
+            half = z * np.sqrt(p * (1 - p) / nobs + z ** 2 / (4 * nobs ** 2)) / denom
+            lower = center - half
+            upper = center + half
+        elif method == 'clopper-pearson':
+            lower = np.where(count > 0, stats.beta.ppf(alpha / 2, count, nobs - count + 1), 0.0)
+            upper = np.where(count < nobs, stats.beta.ppf(1 - alpha / 2, count + 1, nobs - count), 1.0)
+        else:
+            raise ValueError(f"未知的置信区间方法: {method}, 可选: {CI_METHODS}")
+
+    lower = np.where(empty, 0.0, lower)
+    upper = np.where(empty, 0.0, upper)
+    return lower, upper
+
+
+def add_ci_columns(table, count_col, nobs_col, prefix, alpha=0.05, method='normal'):
+    """给日/周/分群汇总表加上 {prefix}_ci_lower / {prefix}_ci_upper 两列"""
+    lower, upper = proportion_ci(table[count_col].to_numpy(), table[nobs_col].to_numpy(),
+                                 alpha=alpha, method=method)
+    table[f'{prefix}_ci_lower'] = lower
+    table[f'{prefix}_ci_upper'] = upper
+    return table
@@ -0,0 +1,148 @@
+"""
+分群趋势监控
+一次构建 分群 × 天 的 good/total 计数立方体, 再用沿天数的前缀和对所有分群、所有窗口终点同时计算:
+- 最近 window 天 vs 之前 baseline 天的双比例z检验
+- window + baseline 天内质量随天数的线性斜率, 及其Cochran-Armitage趋势检验
+同一终点上的各分群按BH控制FDR; 代价是 分群数 × 天数 的数组运算, 不对每个分群单独拟合模型
+
+用法:
+    python3 generate_report.py monitor --window 7 --baseline 28
+"""
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.hypothesis import benjamini_hochberg, two_proportion_ztest, two_sided_p
+
+MONITOR_DIMENSIONS = ['publisher_zone', 'traffic_type']
+DEFAULT_WINDOW = 7
+DEFAULT_BASELINE = 28
+# 窗口和基线期都至少要有这么多leads才做检验
+DEFAULT_MIN_LEADS = 20
+
+
+class SegmentDayCube:
+    """
+    分群 × 天 的计数立方体
+    segments: 每行一个分群的维度取值; dates: 连续的日历天 (没有leads的天计数为0);
+    good / total: 形状 (分群数, 天数) 的计数
+    """
+
+    def __init__(self, segments, dates, good, total):
+        self.segments = segments
+        self.dates = dates
+        self.good = good
+        self.total = total
+
+    @classmethod
+    def from_frame(cls, df, dimensions=None, date_col='date'):
+        """按 dimensions 的交叉组合分群, 缺失值记为 'missing'; 日期缺失的行不计入"""
+        dimensions = MONITOR_DIMENSIONS if dimensions is None else list(dimensions)
+        dates = pd.to_datetime(df[date_col]).dt.normalize()
+        valid = dates.notna().to_numpy()
+        keys = [df[dim].astype(object).where(df[dim].notna(), 'missing')[valid] for dim in dimensions]
+        segment_codes, uniques = pd.MultiIndex.from_arrays(keys, names=dimensions).factorize()
+
+        dates = dates[valid]
+        start = dates.min()
+        day = (dates - start).dt.days.to_numpy()
+        shape = (len(uniques), int(day.max()) + 1 if len(day) else 0)
+        flat = segment_codes * shape[1] + day
+        size = shape[0] * shape[1]
+        total = np.bincount(flat, minlength=size).reshape(shape)
+        good = np.rint(np.bincount(flat, weights=df['is_good'].to_numpy(dtype=np.float64)[valid],
+                                   minlength=size)).astype(np.int64).reshape(shape)
+        return cls(uniques.to_frame(index=False, name=dimensions), pd.date_range(start, periods=shape[1], freq='D'), good, total)
+
+    def rollup(self, dimensions):
+        """按部分维度汇总 (如只看 publisher_zone)"""
+        dimensions = list(dimensions)
+        codes, uniques = pd.MultiIndex.from_frame(self.segments[dimensions]).factorize()
+        good = np.zeros((len(uniques), len(self.dates)), dtype=np.int64)
+        total = np.zeros_like(good)
+        np.add.at(good, codes, self.good)
+        np.add.at(total, codes, self.total)
+        return SegmentDayCube(uniques.to_frame(index=False, name=dimensions), self.dates, good, total)
+
+
+def _window_sums(prefix, end, length):
+    """prefix 为带前导0的累加 (分群数, 天数+1); 返回以 end (含) 结束、长 length 天的和, 越界为NaN"""
+    start = end + 1 - length
+    valid = start >= 0
+    sums = prefix[:, end + 1] - prefix[:, np.maximum(start, 0)]
+    return np.where(valid, sums, np.nan)
+
+
+def rolling_trends(cube, window=DEFAULT_WINDOW, baseline=DEFAULT_BASELINE):
+    """
+    所有分群在每个窗口终点上的统计, 每项都是 (分群数, 天数) 数组, 历史不足 window + baseline 天的终点为NaN
+    z_stat > 0 表示窗口内质量高于基线期; slope 为每天质量变化 (按leads加权的线性回归)
+    """
+    good = cube.good.astype(np.float64)
+    total = cube.total.astype(np.float64)
+    day = np.arange(len(cube.dates), dtype=np.float64)
+
+    def prefix(values):
+        return np.concatenate([np.zeros((values.shape[0], 1)), np.cumsum(values, axis=1)], axis=1)
+
+    end = np.arange(len(cube.dates))
+    span = window + baseline
+    good_prefix, total_prefix = prefix(good), prefix(total)
+    window_good = _window_sums(good_prefix, end, window)
+    window_total = _window_sums(total_prefix, end, window)
+    baseline_good = _window_sums(good_prefix, end - window, baseline)
+    baseline_total = _window_sums(total_prefix, end - window, baseline)
+    z_stat, p_value = two_proportion_ztest(baseline_good, baseline_total, window_good, window_total)
+
+    # 斜率和Cochran-Armitage统计量只需要 n, good, n*x, n*x^2, x*good 五个区间和
+    n = _window_sums(total_prefix, end, span)
+    g = _window_sums(good_prefix, end, span)
+    nx = _window_sums(prefix(total * day), end, span)
+    gx = _window_sums(prefix(good * day), end, span)
+    nxx = _window_sums(prefix(total * day ** 2), end, span)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_bar = g / n
+        sxx = nxx - nx ** 2 / n
+        sxy = gx - nx * p_bar
+        slope = sxy / sxx
+        slope_z = sxy / np.sqrt(p_bar * (1 - p_bar) * sxx)
+        window_rate = window_good / window_total
+        baseline_rate = baseline_good / baseline_total
+
+    return {
+        'window_leads': window_total,
+        'window_rate': window_rate,
+        'baseline_leads': baseline_total,
+        'baseline_rate': baseline_rate,
+        'z_stat': z_stat,
+        'p_value': p_value,
+        'slope': slope,
+        'slope_z': slope_z,
+        'slope_p_value': two_sided_p(slope_z),
+    }
+
+
+def scan_segment_trends(cube, window=DEFAULT_WINDOW, baseline=DEFAULT_BASELINE, as_of=None,
+                        min_leads=DEFAULT_MIN_LEADS, alpha=0.05):
+    """
+    截至 as_of (默认最后一天) 的各分群趋势, 每个分群一行
+    窗口或基线期leads不足 min_leads 的分群不检验 (p值为NaN, 也不计入BH的检验个数)
+    degrading: 窗口质量显著低于基线期, 或斜率显著为负 (BH校正后 < alpha); improving 相反
+    """
+    stats = rolling_trends(cube, window=window, baseline=baseline)
+    end = len(cube.dates) - 1 if as_of is None else int(cube.dates.get_loc(pd.Timestamp(as_of).normalize()))
+    result = cube.segments.copy()
+    for name, values in stats.items():
+        result[name] = values[:, end]
+
+    tested = (result['window_leads'] >= min_leads) & (result['baseline_leads'] >= min_leads)
+    for col in ['z_stat', 'p_value', 'slope_z', 'slope_p_value']:
+        result[col] = result[col].where(tested)
+    result['p_adjusted'], rate_significant = benjamini_hochberg(result['p_value'].to_numpy(), alpha=alpha)
+    result['slope_p_adjusted'], slope_significant = benjamini_hochberg(result['slope_p_value'].to_numpy(),
+                                                                       alpha=alpha)
+    result['rate_change'] = result['window_rate'] - result['baseline_rate']
+    result['degrading'] = (rate_significant & (result['z_stat'] < 0)) | (slope_significant & (result['slope'] < 0))
+    result['improving'] = (rate_significant & (result['z_stat'] > 0)) | (slope_significant & (result['slope'] > 0))
+    result.insert(0, 'window_end', cube.dates[end])
+    return result.sort_values('p_value', na_position='last', kind='stable').reset_index(drop=True)
@@ -0,0 +1,459 @@
+"""
+分析流水线
+报告 (markdown/HTML) 和图表共用的中间结果都是命名节点: baseline / daily_stats / weekly_stats /
+segment_cube / segment_table / trend / scenarios / scenario_uncertainty 等;
+节点结果按 (节点名, 数据指纹, 节点参数) 记忆化,
+同一份数据在一次运行中每个汇总只算一次, 再交给各个渲染函数;
+标记为 persist 的节点还可以写入磁盘缓存 (lead_quality.cache), 数据没变时跨运行复用;
+从存储建立的流水线在增量汇总表 (lead_quality.incremental) 覆盖整个存储时, 计数类节点直接读汇总表
+pandas/scipy/statsmodels 只在节点真正需要计算时导入, 命中缓存的运行不加载它们
+"""
+
+import hashlib
+import time
+
+from lead_quality import instrument
+from lead_quality.store import STORE_PATH, store_fingerprint
+
+# 除分群维度外流水线用到的列, 只从存储中读取这些列
+BASE_COLUMNS = ['is_good', 'is_closed', 'is_bad', 'date', 'week', 'day_index', 'AddressScore', 'PhoneScore']
+
+# dimensions / cut_percentages 为 None 时使用 segments.DEFAULT_DIMENSIONS / scenarios.DEFAULT_CUT_PERCENTAGES,
+# monitor_* 为 None 时使用 lead_quality.monitor 中的默认值
+DEFAULT_PARAMS = {
+    'target_rate': 0.096,
+    'dimensions': None,
+    'min_leads': 50,
+    'top_n': 5,
+    'cut_percentages': None,
+    'monitor_window': None,
+    'monitor_baseline': None,
+    'monitor_min_leads': None,
+    'bootstrap_replicates': 10_000,
+}
+
+# 节点名 -> (计算函数, 用到的参数, 是否写入磁盘缓存)
+NODES = {}
+
+# (节点名, 数据指纹, 参数) -> 结果; 同一进程内不同的 Pipeline 实例共享
+_MEMO = {}
+
+_MISSING = object()
+
+
+def node(name, params=(), persist=False):
+    """
+    注册节点; 计算函数接收 Pipeline, 依赖的其他节点通过 pipeline[name] 取得
+    params 需要包含依赖节点用到的参数; persist 的节点结果会写入磁盘缓存
+    """
+    def register(func):
+        NODES[name] = (func, tuple(params), persist)
+        return func
+    return register
+
+
+def pipeline_columns(dimensions=None):
+    if dimensions is None:
+        from lead_quality.segments import DEFAULT_DIMENSIONS
+        dimensions = DEFAULT_DIMENSIONS
+    return BASE_COLUMNS + [dim for dim in dimensions if dim not in BASE_COLUMNS]
+
+
+def data_fingerprint(df):
+    """数据指纹: 列名 + 逐行哈希"""
+    import pandas as pd
+    digest = hashlib.sha1(repr(list(df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def clear_memo():
+    _MEMO.clear()
+
+
+class Pipeline:
+    """
+    一份清洗后数据上的全部节点
+    数据可以直接传入, 也可以给出 loader + fingerprint, 只在有节点需要计算时才加载;
+    store_path 为数据所在的存储, 用来读取持久化的汇总表
+    """
+
+    def __init__(self, df=None, loader=None, fingerprint=None, cache=None, store_path=None, **params):
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"未知参数: {sorted(unknown)}")
+        if df is None and loader is None:
+            raise ValueError("需要 df 或 loader")
+        self._df = df
+        self._loader = loader
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.fingerprint = fingerprint if fingerprint is not None else data_fingerprint(df)
+        self.cache = cache
+        self.store_path = store_path
+        # 节点名 -> (耗时秒数, 来源: computed / cache / memo); 耗时包含依赖节点
+        self.timings = {}
+
+    @classmethod
+    def load(cls, path=STORE_PATH, columns=None, cache=None, **params):
+        """以存储文件的指纹建立流水线, 数据延迟加载; columns 默认为 pipeline_columns()"""
+        fingerprint = hashlib.sha1(f'{store_fingerprint(path)}:{columns!r}'.encode('utf-8')).hexdigest()
+
+        def loader():
+            from lead_quality.store import load_cleaned
+            return load_cleaned(columns=columns or pipeline_columns(params.get('dimensions')), path=path)
+
+        return cls(loader=loader, fingerprint=fingerprint, cache=cache, store_path=path, **params)
+
+    @property
+    def df(self):
+        if self._df is None:
+            with instrument.stage('load_data', kind='load') as current:
+                self._df = self._loader()
+                current.record(rows_out=len(self._df))
+        return self._df
+
+    @property
+    def loaded(self):
+        return self._df is not None
+
+    def aggregates(self, name):
+        """存储的增量汇总表 (daily / weekly / segments); 没有存储或汇总表不是最新时为 None"""
+        if self.store_path is None:
+            return None
+        from lead_quality.incremental import current_aggregates
+        return current_aggregates(name, self.store_path)
+
+    def node_params(self, name):
+        return {key: self.params[key] for key in NODES[name][1]}
+
+    def __getitem__(self, name):
+        func, _, persist = NODES[name]
+        key = (name, self.fingerprint, _freeze(self.node_params(name)))
+        if key in _MEMO:
+            self.timings.setdefault(name, (0.0, 'memo'))
+            return _MEMO[key]
+
+        start = time.perf_counter()
+        source = 'computed'
+        with instrument.stage(name, kind='node') as current:
+            if persist and self.cache is not None:
+                cache_key = self.cache.key(*key)
+                value = self.cache.get(cache_key, _MISSING)
+                if value is _MISSING:
+                    value = func(self)
+                    self.cache.put(cache_key, value)
+                else:
+                    source = 'cache'
+            else:
+                value = func(self)
+            # 命中缓存时数据没有加载, 没有输入行数
+            current.record(source=source, rows_in=len(self._df) if self.loaded else None,
+                           rows_out=instrument.count_rows(value))
+        _MEMO[key] = value
+        self.timings[name] = (time.perf_counter() - start, source)
+        return value
+
+
+def calculate_baseline(df):
+    """计算基线指标"""
+    all_leads = len(df)
+    good_quality_count = df['is_good'].sum()
+    closed_count = df['is_closed'].sum()
+    bad_count = df['is_bad'].sum()
+
+    return {
+        'all_leads': all_leads,
+        'GoodQualityRate': good_quality_count / all_leads,
+        'CloseRate': closed_count / all_leads,
+        'BadRate': bad_count / all_leads,
+        'good_count': good_quality_count,
+        'closed_count': closed_count,
+        'bad_count': bad_count
+    }
+
+
+def baseline_from_counts(counts):
+    """由日/周计数表 (good_count/total_count/closed_count/bad_count) 计算基线指标, 格式同 calculate_baseline"""
+    all_leads = int(counts['total_count'].sum())
+    good_quality_count = counts['good_count'].sum()
+    closed_count = counts['closed_count'].sum()
+    bad_count = counts['bad_count'].sum()
+
+    return {
+        'all_leads': all_leads,
+        'GoodQualityRate': good_quality_count / all_leads,
+        'CloseRate': closed_count / all_leads,
+        'BadRate': bad_count / all_leads,
+        'good_count': good_quality_count,
+        'closed_count': closed_count,
+        'bad_count': bad_count
+    }
+
+
+def period_stats(df, key):
+    """按日/周汇总计数和三个比率, GoodQualityRate带95% CI"""
+    counts = df.groupby(key).agg(
+        good_count=('is_good', 'sum'),
+        total_count=('is_good', 'count'),
+        closed_count=('is_closed', 'sum'),
+        bad_count=('is_bad', 'sum'),
+    ).reset_index()
+    return period_rates(counts)
+
+
+def period_rates(counts):
+    """在日/周计数表上加三个比率, GoodQualityRate带95% CI; 计数可以来自 period_stats 或增量汇总表"""
+    from lead_quality.intervals import add_ci_columns
+    stats = counts.copy()
+    stats['GoodQualityRate'] = stats['good_count'] / stats['total_count']
+    stats['CloseRate'] = stats['closed_count'] / stats['total_count']
+    stats['BadRate'] = stats['bad_count'] / stats['total_count']
+    add_ci_columns(stats, 'good_count', 'total_count', 'GoodQualityRate')
+    return stats
+
+
+def analyze_trend(df):
+    """
+    分析趋势: 前后两半z检验 + 按天汇总的趋势检验 (lead_quality.trend)
+    二项GLM带截距, 与以日历天数为自变量的逐行Logit估计相同 (不是 day_index, 见 trend.binomial_trend),
+    代价只和天数有关
+    """
+    from lead_quality.hypothesis import two_proportion_ztest
+    from lead_quality.trend import daily_counts, trend_summary
+
+    df_sorted = df.sort_values('date').reset_index(drop=True)
+    mid_point = len(df_sorted) // 2
+
+    first_half = df_sorted.iloc[:mid_point]
+    second_half = df_sorted.iloc[mid_point:]
+
+    rate_first = first_half['is_good'].mean()
+    rate_second = second_half['is_good'].mean()
+    z_stat, p_value = two_proportion_ztest(first_half['is_good'].sum(), len(first_half),
+                                           second_half['is_good'].sum(), len(second_half))
+
+    daily = trend_summary(daily_counts(df))
+    coef = daily['slope']
+    p_value_coef = daily['p_value_glm']
+
+    return {
+        'overall_rate': df['is_good'].mean(),
+        'first_half_rate': rate_first,
+        'second_half_rate': rate_second,
+        'change_direction': '改善' if rate_second > rate_first else '下降' if rate_second < rate_first else '无明显变化',
+        'change_magnitude': abs(rate_second - rate_first),
+        'change_pct': abs((rate_second - rate_first)/rate_first*100) if rate_first > 0 else 0,
+        'p_value_ztest': float(p_value),
+        'p_value_logistic': p_value_coef,
+        'significant': p_value < 0.05 or p_value_coef < 0.05,
+        'trend_coef': coef,
+        'p_value_cochran_armitage': daily['p_value_cochran_armitage'],
+        'change_point_date': daily['change_point_date'],
+        'change_point_rate_before': daily['change_point_rate_before'],
+        'change_point_rate_after': daily['change_point_rate_after'],
+        'p_value_change_point': daily['p_value_change_point'],
+    }
+
+
+def score_columns(columns):
+    """按列名找 PhoneScore / AddressScore 原始分数列 (不含分箱列)"""
+    phone_score_col = address_score_col = None
+    for col in columns:
+        if 'address' in col.lower() and 'score' in col.lower() and 'bin' not in col.lower():
+            address_score_col = col
+        if 'phone' in col.lower() and 'score' in col.lower() and 'bin' not in col.lower():
+            phone_score_col = col
+    return phone_score_col, address_score_col
+
+
+def cut_tail_name(cut_pct):
+    return f'Scenario A: 砍掉最差{cut_pct}%流量'
+
+
+REALLOCATION_NAME = 'Scenario B: 分群 +30% / -30%, 总量不变'
+
+
+def score_gates(phone_score_col, address_score_col):
+    """Scenario C 的门槛: [(名称, phone_min, address_min), ...]"""
+    gates = []
+    if phone_score_col:
+        gates.append(('Scenario C: PhoneScore >= 4', 4, None))
+    if address_score_col:
+        gates.append(('Scenario C: AddressScore >= 4', None, 4))
+    return gates
+
+
+def analyze_uplift_scenarios(curve, gating, phone_score_col, address_score_col, target_rate=0.096):
+    """分析uplift情景: Scenario A 砍尾巴曲线 + Scenario C 分数门槛"""
+    scenarios = []
+
+    for cut_pct, new_rate in zip(curve['cut_pct'], curve['new_rate']):
+        scenarios.append({
+            'name': cut_tail_name(cut_pct),
+            'new_rate': new_rate,
+            'reached_target': new_rate >= target_rate,
+            'volume_drop': cut_pct
+        })
+
+    for name, phone_min, address_min in score_gates(phone_score_col, address_score_col):
+        result = gating.lookup(phone_min, address_min)
+        if result['remaining_volume'] > 0:
+            scenarios.append({
+                'name': name,
+                'new_rate': result['new_rate'],
+                'reached_target': result['new_rate'] >= target_rate,
+                'volume_drop': result['volume_drop_pct']
+            })
+
+    return scenarios
+
+
+@node('baseline', persist=True)
+def _baseline(p):
+    daily = p.aggregates('daily')
+    if daily is not None:
+        return baseline_from_counts(daily)
+    return calculate_baseline(p.df)
+
+
+@node('daily_stats', persist=True)
+def _daily_stats(p):
+    import pandas as pd
+    daily = p.aggregates('daily')
+    stats = period_rates(daily) if daily is not None else period_stats(p.df, 'date')
+    stats['date'] = pd.to_datetime(stats['date'])
+    # 7日滚动均值
+    for metric in ['GoodQualityRate', 'CloseRate', 'BadRate']:
+        stats[f'{metric}_7d'] = stats[metric].rolling(window=7, min_periods=1).mean()
+    return stats
+
+
+@node('weekly_stats', persist=True)
+def _weekly_stats(p):
+    weekly = p.aggregates('weekly')
+    return period_rates(weekly) if weekly is not None else period_stats(p.df, 'week')
+
+
+@node('segment_cube', params=['dimensions'], persist=True)
+def _segment_cube(p):
+    """全部分群维度交叉组合的计数立方体, 分群表和任意组合的下钻查询都从它汇总"""
+    from lead_quality.cube import SegmentCube
+    return SegmentCube.from_frame(p.df, p.params['dimensions'])
+
+
+@node('segment_table', params=['dimensions', 'min_leads'], persist=True)
+def _segment_table(p):
+    import pandas as pd
+    from lead_quality.incremental import SEGMENT_DIMENSIONS
+    from lead_quality.segments import DEFAULT_DIMENSIONS, add_segment_metrics
+    dimensions = DEFAULT_DIMENSIONS if p.params['dimensions'] is None else p.params['dimensions']
+    counts = p.aggregates('segments') if dimensions and set(dimensions) <= set(SEGMENT_DIMENSIONS) else None
+    if counts is None:
+        cube = p['segment_cube']
+        return cube.segment_stats(cube.dimensions, baseline_rate=p['baseline']['GoodQualityRate'],
+                                  min_leads=p.params['min_leads'])
+
+    # 汇总表里的分群按首次出现的顺序排列, 和立方体的 roll-up 一致
+    table = pd.concat([counts[counts['dimension'] == dim] for dim in dimensions], ignore_index=True)
+    table = table.rename(columns={'total_count': 'leads'})
+    baseline = p['baseline']
+    return add_segment_metrics(table[['dimension', 'segment', 'leads', 'good_count', 'closed_count', 'bad_count']],
+                               int(baseline['good_count']), baseline['all_leads'],
+                               baseline_rate=baseline['GoodQualityRate'], min_leads=p.params['min_leads'])
+
+
+@node('top_segments', params=['dimensions', 'min_leads', 'top_n'], persist=True)
+def _top_segments(p):
+    from lead_quality.segments import top_segments
+    return top_segments(p['segment_table'], n=p.params['top_n'])
+
+
+@node('trend', persist=True)
+def _trend(p):
+    return analyze_trend(p.df)
+
+
+@node('segment_trends', params=['monitor_window', 'monitor_baseline', 'monitor_min_leads'], persist=True)
+def _segment_trends(p):
+    """publisher_zone × traffic_type 各分群截至最后一天的滚动窗口趋势扫描"""
+    from lead_quality import monitor
+    dimensions = [dim for dim in monitor.MONITOR_DIMENSIONS if dim in p.df.columns]
+    cube = monitor.SegmentDayCube.from_frame(p.df, dimensions)
+    window, baseline, min_leads = (p.params[name] if p.params[name] is not None else default for name, default in [
+        ('monitor_window', monitor.DEFAULT_WINDOW),
+        ('monitor_baseline', monitor.DEFAULT_BASELINE),
+        ('monitor_min_leads', monitor.DEFAULT_MIN_LEADS),
+    ])
+    return monitor.scan_segment_trends(cube, window=window, baseline=baseline, min_leads=min_leads)
+
+
+@node('cut_tail', params=['cut_percentages'], persist=True)
+def _cut_tail(p):
+    from lead_quality.scenarios import DEFAULT_CUT_PERCENTAGES, cut_tail_curve
+    baseline = p['baseline']
+    return cut_tail_curve(baseline['good_count'], baseline['all_leads'],
+                          p.params['cut_percentages'] or DEFAULT_CUT_PERCENTAGES)
+
+
+@node('cut_tail_curve', persist=True)
+def _cut_tail_curve(p):
+    """0.1% 步长的细曲线"""
+    from lead_quality.scenarios import cut_tail_curve
+    baseline = p['baseline']
+    return cut_tail_curve(baseline['good_count'], baseline['all_leads'], step=0.1, max_pct=50)
+
+
+@node('gating')
+def _gating(p):
+    from lead_quality.scenarios import GatingIndex
+    return GatingIndex.from_frame(p.df, *score_columns(p.df.columns))
+
+
+@node('scenarios', params=['cut_percentages', 'target_rate'], persist=True)
+def _scenarios(p):
+    return analyze_uplift_scenarios(p['cut_tail'], p['gating'], *score_columns(p.df.columns),
+                                    target_rate=p.params['target_rate'])
+
+
+@node('scenario_uncertainty', params=['cut_percentages', 'target_rate', 'bootstrap_replicates'], persist=True)
+def _scenario_uncertainty(p):
+    """
+    Scenario A/B/C 的bootstrap: 质量区间和达到目标的概率 (lead_quality.bootstrap)
+    Scenario B 与 04_uplift_scenarios.ipynb 相同: 各分群 +30% / -30%, 总量不变
+    """
+    from lead_quality import bootstrap
+    from lead_quality.scenarios import REALLOCATION_DIMENSIONS, optimize_reallocation, segment_counts
+
+    baseline, gating = p['baseline'], p['gating']
+    specs = [bootstrap.cut_tail_spec(cut_tail_name(cut_pct), baseline['good_count'], baseline['all_leads'], cut_pct)
+             for cut_pct in p['cut_tail']['cut_pct']]
+    if all(dim in p.df.columns for dim in REALLOCATION_DIMENSIONS):
+        segments = segment_counts(p.df)
+        mix, _ = optimize_reallocation(segments, p.params['target_rate'], max_increase=0.3, max_cut=0.3,
+                                       budget=len(p.df))
+        specs.append(bootstrap.reallocation_spec(REALLOCATION_NAME, segments['leads'], segments['good_count'],
+                                                 mix['new_leads']))
+    specs += [bootstrap.gating_spec(name, gating, phone_min, address_min)
+              for name, phone_min, address_min in score_gates(*score_columns(p.df.columns))]
+    return bootstrap.bootstrap_scenarios(specs, target_rate=p.params['target_rate'],
+                                         n_replicates=p.params['bootstrap_replicates'])
+
+
+@node('best_scenario', params=['cut_percentages', 'target_rate'], persist=True)
+def _best_scenario(p):
+    """达到目标的情景中质量最高的一个, 没有则为 None"""
+    best_scenario = None
+    best_rate = p['baseline']['GoodQualityRate']
+    for s in p['scenarios']:
+        if s['reached_target'] and s['new_rate'] > best_rate:
+            best_rate = s['new_rate']
+            best_scenario = s
+    return best_scenario
@@ -0,0 +1,259 @@
+"""
+Uplift情景计算
+Scenario A (砍尾巴): 按 is_good 升序砍掉前 cut% 的流量. is_good 是0/1标签,
+砍掉的总是先是坏lead, 所以新的质量只由 good/total 两个计数决定, 不需要排序和复制数据
+Scenario B (结构性再分配): 在分群汇总上解线性规划, 求各分群量上下限内达到目标质量的最大总量
+Scenario C (分数门槛): 预先算好 (PhoneScore, AddressScore) 的二维累计计数, 任意门槛组合直接查表
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CUT_PERCENTAGES = [5, 10, 15, 20]
+
+# Scenario B 默认的再分配分群
+REALLOCATION_DIMENSIONS = ['publisher_zone', 'traffic_type']
+
+
+def cut_tail_curve(good_count, total, cut_percentages=None, step=0.1, max_pct=50, target_rate=None):
+    """
+    计算砍掉最差 cut% 流量后的质量和剩余量
+    cut_percentages 为空时按 step 生成 0~max_pct 的细网格
+    返回列: cut_pct / new_rate / remaining_volume / volume_drop_pct (/ reached_target)
+    """
+    if cut_percentages is None:
+        cut_percentages = np.round(np.arange(0, max_pct + step / 2, step), 6)
+    cut_pct = np.asarray(cut_percentages, dtype=np.float64)
+
+    # 与 int(len(df) * cut_pct / 100) 取整方式一致
+    cut_n = np.floor(total * cut_pct / 100).astype(np.int64)
+    bad_count = total - good_count
+    removed_good = np.maximum(0, cut_n - bad_count)
+    remaining = total - cut_n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_rate = (good_count - removed_good) / remaining
+
+    curve = pd.DataFrame({
+        'cut_pct': np.asarray(cut_percentages),
+        'new_rate': new_rate,
+        'remaining_volume': remaining,
+        'volume_drop_pct': (total - remaining) / total * 100,
+    })
+    if target_rate is not None:
+        curve['reached_target'] = curve['new_rate'] >= target_rate
+    return curve
+
+
+def min_cut_for_target(curve, target_rate):
+    """曲线上达到目标质量所需的最小砍量, 达不到时返回 None"""
+    reached = curve[curve['new_rate'] >= target_rate]
+    if len(reached) == 0:
+        return None
+    return reached.iloc[0].to_dict()
+
+
+def segment_counts(df, dimensions=None, min_leads=0):
+    """按若干维度交叉汇总 leads / good_count / rate, 缺失值记为 'missing'"""
+    dimensions = REALLOCATION_DIMENSIONS if dimensions is None else dimensions
+    keys = [df[dim].astype(object).where(df[dim].notna(), 'missing') for dim in dimensions]
+    counts = df.groupby(keys, sort=False)['is_good'].agg(leads='count', good_count='sum').reset_index()
+    counts = counts[counts['leads'] >= min_leads].reset_index(drop=True)
+    counts['rate'] = counts['good_count'] / counts['leads']
+    return counts
+
+
+def _max_rate_mix(rate, lower, upper, budget=None):
+    """
+    达不到目标时质量最高的组合: 各分群先取下限, 再按质量从高到低加量, 取整体质量最高的前缀;
+    给出 budget 时 (总量不变的再分配) 一直加到 budget 为止, 即该总量下质量最高的组合
+    """
+    order = np.argsort(-rate, kind='stable')
+    extra = (upper - lower)[order]
+    if budget is not None:
+        room = max(0.0, budget - lower.sum())
+        extra = np.minimum(extra, np.maximum(0.0, room - (np.cumsum(extra) - extra)))
+        mix = lower.copy()
+        mix[order] += extra
+        return mix
+    good = (lower * rate).sum() + np.concatenate([[0.0], np.cumsum(extra * rate[order])])
+    volume = lower.sum() + np.concatenate([[0.0], np.cumsum(extra)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mix_rate = np.where(volume > 0, good / volume, -np.inf)
+    k = int(np.argmax(mix_rate))
+    mix = lower.copy()
+    mix[order[:k]] += extra[:k]
+    return mix
+
+
+def _max_volume_mix(rate, lower, upper, target_rate):
+    """
+    无总量上限时是分数背包: 达标分群取上限, 其余先取下限,
+    再按质量从高到低用剩余的"质量余量"加量; 达不到目标返回 None
+    """
+    mix = np.where(rate >= target_rate, upper, lower)
+    slack = (mix * (rate - target_rate)).sum()
+    if slack < 0:
+        return None
+    below = np.flatnonzero(rate < target_rate)
+    below = below[np.argsort(-rate[below], kind='stable')]
+    unit_cost = target_rate - rate[below]
+    cost = np.cumsum(unit_cost * (upper - lower)[below])
+    full = cost <= slack
+    mix[below[full]] = upper[below[full]]
+    n_full = int(full.sum())
+    if n_full < len(below):
+        spent = cost[n_full - 1] if n_full > 0 else 0.0
+        mix[below[n_full]] += (slack - spent) / unit_cost[n_full]
+    return mix
+
+
+def optimize_reallocation(segments, target_rate, max_increase=0.3, max_cut=1.0, budget=None):
+    """
+    Scenario B: 每个分群的量限制在 当前量 × [1 - max_cut, 1 + max_increase] 内,
+    求整体质量 >= target_rate 时的最大总量; budget 为总量上限 (此时用线性规划求解)
+    达不到目标时返回质量最高的组合; 给出 budget 时该组合的总量等于 budget (分群上下限允许时)
+    segments 需要 leads / good_count 列 (见 segment_counts); 返回 (加了 new_leads 列的分群表, 汇总)
+    """
+    leads = segments['leads'].to_numpy(dtype=np.float64)
+    good = segments['good_count'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(leads > 0, good / leads, 0.0)
+    lower = leads * (1 - max_cut)
+    upper = leads * (1 + max_increase)
+
+    if budget is None:
+        new_leads = _max_volume_mix(rate, lower, upper, target_rate)
+    else:
+        from scipy.optimize import linprog
+        # sum(v * rate) >= target_rate * sum(v)  <=>  sum(v * (target_rate - rate)) <= 0
+        solution = linprog(-np.ones(len(leads)),
+                           A_ub=np.vstack([target_rate - rate, np.ones(len(leads))]), b_ub=[0.0, budget],
+                           bounds=np.column_stack([lower, upper]), method='highs')
+        new_leads = solution.x if solution.status == 0 else None
+
+    # 全部砍掉 (总量为0) 不算达到目标
+    reached = new_leads is not None and new_leads.sum() > 0
+    if not reached:
+        new_leads = _max_rate_mix(rate, lower, upper, budget)
+    total = new_leads.sum()
+    change = new_leads - leads
+
+    mix = segments.copy()
+    mix['new_leads'] = new_leads
+    mix['change'] = change
+    summary = {
+        'status': 'optimal' if reached else 'infeasible',
+        'new_rate': (new_leads * rate).sum() / total if total > 0 else np.nan,
+        'reached_target': reached,
+        'total_volume': total,
+        'volume_change_pct': (total - leads.sum()) / leads.sum() * 100,
+        'volume_increase': change[change > 0].sum(),
+        'volume_decrease': -change[change < 0].sum(),
+    }
+    return mix, summary
+
+
+class GatingIndex:
+    """
+    Scenario C (分数门槛) 的二维累计计数索引
+    按 (PhoneScore, AddressScore) 取值 (含缺失桶) 统计 total/good, 再做二维后缀累加;
+    任意门槛组合的剩余量和质量都是 O(1) 查表, 不需要过滤原始数据
+    """
+
+    def __init__(self, phone_scores, address_scores, is_good):
+        phone_scores = np.asarray(phone_scores, dtype=np.float64)
+        address_scores = np.asarray(address_scores, dtype=np.float64)
+        is_good = np.asarray(is_good, dtype=np.float64)
+
+        self.phone_values = np.unique(phone_scores[~np.isnan(phone_scores)])
+        self.address_values = np.unique(address_scores[~np.isnan(address_scores)])
+        # 第0格是缺失桶: 只有"不设门槛"时才会包含它
+        phone_idx = self._bucket(self.phone_values, phone_scores)
+        address_idx = self._bucket(self.address_values, address_scores)
+
+        shape = (len(self.phone_values) + 1, len(self.address_values) + 1)
+        flat = phone_idx * shape[1] + address_idx
+        size = shape[0] * shape[1]
+        total = np.bincount(flat, minlength=size).reshape(shape)
+        good = np.rint(np.bincount(flat, weights=is_good, minlength=size)).astype(np.int64).reshape(shape)
+
+        self.total_leads = len(is_good)
+        self._cells = (total, good)
+        self._total = self._suffix_sum(total)
+        self._good = self._suffix_sum(good)
+
+    @staticmethod
+    def _bucket(values, scores):
+        idx = np.searchsorted(values, scores) + 1
+        idx[np.isnan(scores)] = 0
+        return idx
+
+    @staticmethod
+    def _suffix_sum(counts):
+        """S[i, j] = counts[i:, j:].sum(), 末尾补一行一列0用于"门槛高于所有取值" """
+        padded = np.zeros((counts.shape[0] + 1, counts.shape[1] + 1), dtype=np.int64)
+        padded[:-1, :-1] = counts[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+        return padded
+
+    @classmethod
+    def from_frame(cls, df, phone_col='PhoneScore', address_col='AddressScore'):
+        missing = np.full(len(df), np.nan)
+        phone = df[phone_col].to_numpy(dtype=np.float64) if phone_col in df.columns else missing
+        address = df[address_col].to_numpy(dtype=np.float64) if address_col in df.columns else missing
+        return cls(phone, address, df['is_good'].to_numpy())
+
+    @staticmethod
+    def _threshold_index(values, threshold):
+        if threshold is None:
+            return 0
+        return int(np.searchsorted(values, threshold, side='left')) + 1
+
+    def cell_counts(self):
+        """每个 (PhoneScore, AddressScore) 格子的 (total, good) 计数, 第0行/列是缺失桶"""
+        return self._cells
+
+    def threshold_cells(self, phone_min=None, address_min=None):
+        """通过门槛的格子, 用于索引 cell_counts() 的结果"""
+        return (slice(self._threshold_index(self.phone_values, phone_min), None),
+                slice(self._threshold_index(self.address_values, address_min), None))
+
+    def lookup(self, phone_min=None, address_min=None):
+        """PhoneScore >= phone_min 且 AddressScore >= address_min 后的质量和剩余量; None表示不设门槛"""
+        i = self._threshold_index(self.phone_values, phone_min)
+        j = self._threshold_index(self.address_values, address_min)
+        remaining = int(self._total[i, j])
+        good = int(self._good[i, j])
+        return {
+            'phone_min': phone_min,
+            'address_min': address_min,
+            'new_rate': good / remaining if remaining > 0 else np.nan,
+            'remaining_volume': remaining,
+            'volume_drop_pct': (self.total_leads - remaining) / self.total_leads * 100,
+        }
+
+    def sweep(self, target_rate=None):
+        """所有门槛组合 (每个维度: 不设门槛 + 每个出现过的分数)"""
+        phone_thresholds = [None] + self.phone_values.tolist()
+        address_thresholds = [None] + self.address_values.tolist()
+        remaining = self._total[:-1, :-1].ravel()
+        good = self._good[:-1, :-1].ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_rate = np.where(remaining > 0, good / remaining, np.nan)
+        result = pd.DataFrame({
+            'phone_min': np.repeat(np.array(phone_thresholds, dtype=object), len(address_thresholds)),
+            'address_min': np.tile(np.array(address_thresholds, dtype=object), len(phone_thresholds)),
+            'new_rate': new_rate,
+            'remaining_volume': remaining,
+            'volume_drop_pct': (self.total_leads - remaining) / self.total_leads * 100,
+        })
+        if target_rate is not None:
+            result['reached_target'] = result['new_rate'] >= target_rate
+        return result
+
+    def frontier(self, target_rate=None):
+        """量-质帕累托前沿: 没有其他组合能在不少于它的量下得到更高质量"""
+        sweep = self.sweep(target_rate=target_rate)
+        sweep = sweep[sweep['remaining_volume'] > 0]
+        sweep = sweep.sort_values(['remaining_volume', 'new_rate'], ascending=[False, False], kind='stable')
+        best_so_far = sweep['new_rate'].cummax().shift(fill_value=-np.inf)
+        return sweep[sweep['new_rate'] > best_so_far].reset_index(drop=True)
@@ -0,0 +1,247 @@
+"""
+lead质量打分
+持久化的logistic打分模型: 特征词表 (features.FeatureEncoder) + 每个特征每个取值的权重, 存为带版本号的JSON;
+one-hot下每个特征恰好命中一个取值, 打分就是按整数编码取权重求和, 不需要构造矩阵:
+- score_leads: 整批向量化打分 (清洗后的DataFrame, 或原始导出列)
+- LeadScorer.score_one: 单条lead的低延迟路径, 只做字典查找, 用于入口处按分数拦截
+
+用法:
+    python -m lead_quality.scoring train
+    python -m lead_quality.scoring score leads_2009-07-02.csv -o scores.csv
+    python -m lead_quality.scoring benchmark --rows 1000000
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.cleaning import WIDGET_COL, clean_leads, lead_fields
+from lead_quality.features import FeatureEncoder
+from lead_quality.store import STORE_PATH, load_cleaned
+
+MODEL_DIR = 'models'
+
+# 模型文件格式变化时递增
+MODEL_FORMAT = 1
+
+
+def _missing(value):
+    return value is None or (not isinstance(value, str) and pd.isna(value))
+
+
+class LeadScorer:
+    """
+    logistic打分模型
+    weights[col] 为该特征词表各取值 (最后一位是 other) 的系数; 分数 = sigmoid(intercept + 各特征命中取值的系数之和)
+    """
+
+    def __init__(self, encoder, intercept, weights, metadata=None):
+        self.encoder = encoder
+        self.intercept = float(intercept)
+        self.weights = {col: np.asarray(weights[col], dtype=np.float64) for col in encoder.columns}
+        self.metadata = metadata or {}
+        # 单条打分用的查找表: 特征 -> {取值: 系数}, 以及没见过的取值用的 other 系数
+        self._lookup = {col: dict(zip(encoder.vocabulary[col], self.weights[col][:-1].tolist()))
+                        for col in encoder.columns}
+        self._other = {col: float(self.weights[col][-1]) for col in encoder.columns}
+
+    @classmethod
+    def from_logistic(cls, encoder, model, metadata=None):
+        """由 drivers.fit_logistic 拟合的模型构造 (系数顺序与 encoder.feature_names() 一致)"""
+        coef = model.coef_[0]
+        weights, start = {}, 0
+        for col in encoder.columns:
+            size = len(encoder.vocabulary[col]) + 1
+            weights[col] = coef[start:start + size]
+            start += size
+        return cls(encoder, model.intercept_[0], weights, metadata)
+
+    @property
+    def version(self):
+        return self.metadata.get('version')
+
+    def logits(self, df):
+        """整批打分 (logit), df 为清洗后的数据"""
+        codes = self.encoder.codes(df)
+        logit = np.full(len(df), self.intercept)
+        for j, col in enumerate(self.encoder.columns):
+            logit += self.weights[col][codes[:, j]]
+        return logit
+
+    def score(self, df):
+        return 1 / (1 + np.exp(-self.logits(df)))
+
+    def score_one(self, lead):
+        """
+        单条lead打分, lead 为 字段名 -> 值 的字典;
+        含原始 WidgetName 等列时先按 cleaning.lead_fields 得到特征, 否则视为已清洗的特征值
+        """
+        if WIDGET_COL in lead:
+            lead = {**lead, **lead_fields(lead)}
+        logit = self.intercept
+        for col, lookup in self._lookup.items():
+            value = lead.get(col)
+            logit += lookup.get('missing' if _missing(value) else str(value), self._other[col])
+        return 1 / (1 + math.exp(-logit))
+
+    def to_dict(self):
+        return {
+            'format': MODEL_FORMAT,
+            'metadata': self.metadata,
+            'encoder': self.encoder.to_dict(),
+            'intercept': self.intercept,
+            'weights': {col: values.tolist() for col, values in self.weights.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('format') != MODEL_FORMAT:
+            raise ValueError(f"模型文件格式不匹配: {state.get('format')} != {MODEL_FORMAT}")
+        return cls(FeatureEncoder.from_dict(state['encoder']), state['intercept'], state['weights'],
+                   state['metadata'])
+
+
+def _model_files(directory):
+    return sorted(glob.glob(os.path.join(directory, 'lead_scorer_v*.json')),
+                  key=lambda path: int(os.path.basename(path)[len('lead_scorer_v'):-len('.json')]))
+
+
+def save_scorer(scorer, directory=MODEL_DIR):
+    """保存为下一个版本号 lead_scorer_v<N>.json, 已有的版本保留; 返回文件路径"""
+    os.makedirs(directory, exist_ok=True)
+    files = _model_files(directory)
+    version = int(os.path.basename(files[-1])[len('lead_scorer_v'):-len('.json')]) + 1 if files else 1
+    scorer.metadata['version'] = version
+    path = os.path.join(directory, f'lead_scorer_v{version}.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(scorer.to_dict(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_scorer(directory=MODEL_DIR, version=None):
+    """读取指定版本, 默认最新版本"""
+    files = _model_files(directory)
+    if version is not None:
+        files = [path for path in files if path.endswith(f'_v{version}.json')]
+    if not files:
+        raise FileNotFoundError(f"{directory} 中没有打分模型{'' if version is None else f' v{version}'}")
+    with open(files[-1], encoding='utf-8') as f:
+        return LeadScorer.from_dict(json.load(f))
+
+
+def train_scorer(df, C=1.0, min_count=5, holdout=0.2):
+    """
+    在清洗后的数据上训练打分模型
+    先按时间留出最后 holdout 比例的leads评估AUC/PR-AUC, 再用全部数据拟合保存的模型
+    """
+    from sklearn.metrics import average_precision_score, roc_auc_score
+    from lead_quality.drivers import fit_logistic
+
+    df = df.sort_values('date', kind='stable')
+    y = df['is_good'].to_numpy()
+    split = int(len(df) * (1 - holdout))
+    metadata = {'trained_at': datetime.now().isoformat(timespec='seconds'), 'rows': len(df), 'C': C,
+                'date_min': str(df['date'].min()), 'date_max': str(df['date'].max())}
+
+    if 0 < split < len(df) and 0 < y[split:].sum() < len(df) - split:
+        encoder = FeatureEncoder(min_count=min_count).fit(df.iloc[:split])
+        model, _ = fit_logistic(encoder.transform(df.iloc[:split]), y[:split], encoder.feature_names(), C=C)
+        holdout_scores = LeadScorer.from_logistic(encoder, model).score(df.iloc[split:])
+        metadata['holdout_auc'] = float(roc_auc_score(y[split:], holdout_scores))
+        metadata['holdout_pr_auc'] = float(average_precision_score(y[split:], holdout_scores))
+
+    encoder = FeatureEncoder(min_count=min_count).fit(df)
+    model, _ = fit_logistic(encoder.transform(df), y, encoder.feature_names(), C=C)
+    return LeadScorer.from_logistic(encoder, model, metadata)
+
+
+def score_leads(batch, scorer=None):
+    """
+    整批打分, 返回与 batch 行对应的分数 (预测的 is_good 概率)
+    batch 为清洗后的DataFrame; 只有原始导出列 (有 WidgetName 没有 dc_pages) 时先清洗
+    """
+    scorer = load_scorer() if scorer is None else scorer
+    if WIDGET_COL in batch.columns and 'dc_pages' not in batch.columns:
+        batch = clean_leads(batch)
+    return scorer.score(batch)
+
+
+def benchmark(scorer, df, rows=1_000_000, single=10_000, seed=0):
+    """
+    批量吞吐 (leads/秒) 和单条延迟 (微秒分位数)
+    批量用 df 重复抽样到 rows 行; 单条用 df 中随机抽取的原始记录 (含 lead_fields 的特征推导)
+    """
+    rng = np.random.default_rng(seed)
+    batch = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    start = time.perf_counter()
+    scorer.score(batch)
+    batch_seconds = time.perf_counter() - start
+
+    records = df.iloc[rng.integers(0, len(df), single)].to_dict('records')
+    latencies = np.empty(len(records))
+    for i, record in enumerate(records):
+        start = time.perf_counter()
+        scorer.score_one(record)
+        latencies[i] = time.perf_counter() - start
+    latencies *= 1e6
+    return {
+        'batch_rows': rows,
+        'batch_seconds': batch_seconds,
+        'batch_leads_per_second': rows / batch_seconds,
+        'single_calls': len(records),
+        'single_p50_us': float(np.percentile(latencies, 50)),
+        'single_p99_us': float(np.percentile(latencies, 99)),
+        'single_leads_per_second': len(records) / (latencies.sum() / 1e6),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='lead质量打分模型')
+    parser.add_argument('--models', default=MODEL_DIR, help=f'模型目录 (默认 {MODEL_DIR})')
+    parser.add_argument('--store', default=STORE_PATH, help=f'存储路径 (默认 {STORE_PATH})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    train = subparsers.add_parser('train', help='用存储中的数据训练并保存新版本')
+    train.add_argument('--C', type=float, default=1.0, help='L2正则强度的倒数 (默认 1.0)')
+    train.add_argument('--min-count', type=int, default=5, help='进入词表的最少出现次数 (默认 5)')
+    score = subparsers.add_parser('score', help='给导出文件打分')
+    score.add_argument('file_path', help='csv 导出文件 (原始列或清洗后的列)')
+    score.add_argument('-o', '--output', default='scores.csv', help='输出文件 (默认 scores.csv)')
+    score.add_argument('--version', type=int, default=None, help='模型版本 (默认最新)')
+    bench = subparsers.add_parser('benchmark', help='批量吞吐和单条延迟')
+    bench.add_argument('--rows', type=int, default=1_000_000, help='批量打分行数 (默认 1000000)')
+    bench.add_argument('--single', type=int, default=10_000, help='单条打分次数 (默认 10000)')
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        scorer = train_scorer(load_cleaned(path=args.store), C=args.C, min_count=args.min_count)
+        path = save_scorer(scorer, args.models)
+        print(f"已保存 {path}: {scorer.encoder.n_features} 个特征列")
+        if 'holdout_auc' in scorer.metadata:
+            print(f"时间留出集 AUC {scorer.metadata['holdout_auc']:.4f}, PR-AUC {scorer.metadata['holdout_pr_auc']:.4f}")
+    elif args.command == 'score':
+        scorer = load_scorer(args.models, args.version)
+        batch = pd.read_csv(args.file_path)
+        batch['lead_score'] = score_leads(batch, scorer)
+        batch.to_csv(args.output, index=False)
+        print(f"模型 v{scorer.version} 已为 {len(batch):,} 条leads打分 -> {args.output}")
+    else:
+        scorer = load_scorer(args.models)
+        result = benchmark(scorer, load_cleaned(path=args.store), rows=args.rows, single=args.single)
+        print(f"模型 v{scorer.version}")
+        print(f"批量: {result['batch_rows']:,} 行 {result['batch_seconds']:.3f} 秒, "
+              f"{result['batch_leads_per_second']:,.0f} leads/秒")
+        print(f"单条: p50 {result['single_p50_us']:.1f} µs, p99 {result['single_p99_us']:.1f} µs, "
+              f"{result['single_leads_per_second']:,.0f} leads/秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+分群统计引擎
+每个维度只做一次分组: factorize得到类别编码, 再用bincount一次算出
+count/good/closed/bad, 取代逐个取值构造布尔掩码的写法
+"""
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.hypothesis import segment_vs_rest
+from lead_quality.intervals import proportion_ci
+
+# generate_report.py 使用的维度列表
+DEFAULT_DIMENSIONS = ['dc_pages', 'publisher_zone', 'is_call_center', 'address_score_bin',
+                      'phone_score_bin', 'is_branded', 'traffic_type', 'design', 'bg_color']
+
+
+def group_counts(df, segment_col):
+    """按维度取值汇总 leads/good/closed/bad, 取值顺序与 unique() 一致, 缺失值归为 'missing'"""
+    codes, uniques = pd.factorize(df[segment_col], use_na_sentinel=False)
+    k = len(uniques)
+    counts = {'leads': np.bincount(codes, minlength=k)}
+    for flag, name in [('is_good', 'good_count'), ('is_closed', 'closed_count'), ('is_bad', 'bad_count')]:
+        weights = df[flag].to_numpy(dtype=np.float64)
+        counts[name] = np.rint(np.bincount(codes, weights=weights, minlength=k)).astype(np.int64)
+
+    segment_names = ['missing' if pd.isna(v) else str(v) for v in uniques]
+    result = pd.DataFrame({'dimension': segment_col, 'segment': segment_names})
+    for name, values in counts.items():
+        result[name] = values
+    return result
+
+
+SEGMENT_METRIC_COLUMNS = ['rate', 'close_rate', 'bad_rate', 'lift', 'ci_lower', 'ci_upper',
+                          'z_stat', 'p_value', 'p_adjusted', 'significant']
+
+
+def add_segment_metrics(table, all_good, all_total, baseline_rate=None, min_leads=0, ci_method='normal',
+                        alpha=0.05):
+    """
+    在 leads/good_count/closed_count/bad_count 计数表上加比率、lift、置信区间和 vs 其余的检验
+    all_good / all_total 为全部leads的计数; segment_stats 和 cube.SegmentCube 共用
+    """
+    if baseline_rate is None:
+        baseline_rate = all_good / all_total if all_total > 0 else 0
+    result = table.copy()
+    n = result['leads'].to_numpy(dtype=np.float64)
+    good = result['good_count'].to_numpy(dtype=np.float64)
+    result['rate'] = good / n
+    result['close_rate'] = result['closed_count'] / n
+    result['bad_rate'] = result['bad_count'] / n
+    result['lift'] = result['rate'] / baseline_rate if baseline_rate > 0 else 0
+
+    ci_lower, ci_upper = proportion_ci(good, n, alpha=alpha, method=ci_method)
+    result['ci_lower'] = ci_lower
+    result['ci_upper'] = ci_upper
+
+    if min_leads > 0:
+        result = result[result['leads'] >= min_leads].reset_index(drop=True)
+    # 保留下来的全部分群作为一组检验做BH校正
+    tests = segment_vs_rest(result['good_count'].to_numpy(), result['leads'].to_numpy(),
+                            all_good=all_good, all_total=all_total, alpha=alpha)
+    for name, values in tests.items():
+        result[name] = values
+    return result
+
+
+def segment_stats(df, dimensions, baseline_rate=None, min_leads=0, ci_method='normal', alpha=0.05):
+    """
+    一次性计算所有维度的分群指标
+    返回每个 (dimension, segment) 一行: 数量、各项比率、lift、置信区间,
+    以及与其余leads比较的z检验 (lead_quality.hypothesis.segment_vs_rest); significant 为BH校正后的结果
+    """
+    tables = [group_counts(df, dim) for dim in dimensions if dim in df.columns]
+    if not tables:
+        return pd.DataFrame(columns=['dimension', 'segment', 'leads', 'good_count', 'closed_count',
+                                     'bad_count'] + SEGMENT_METRIC_COLUMNS)
+    return add_segment_metrics(pd.concat(tables, ignore_index=True), df['is_good'].sum(), len(df),
+                               baseline_rate=df['is_good'].mean() if baseline_rate is None else baseline_rate,
+                               min_leads=min_leads, ci_method=ci_method, alpha=alpha)
+
+
+def segment_records(table):
+    """转成报告使用的记录格式: dimension/segment/rate/lift/leads"""
+    return table[['dimension', 'segment', 'rate', 'lift', 'leads']].to_dict('records')
+
+
+def top_segments(table, n=5, dimensions=None):
+    """质量最高/最低的 n 个分群 (记录格式); dimensions 限定参与比较的维度"""
+    if dimensions is not None:
+        table = table[table['dimension'].isin(dimensions)]
+    records = pd.DataFrame(segment_records(table))
+    if len(records) == 0:
+        return [], []
+    return records.nlargest(n, 'rate').to_dict('records'), records.nsmallest(n, 'rate').to_dict('records')
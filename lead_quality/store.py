@@ -0,0 +1,194 @@
+"""
+清洗后数据的列式存储
+以Parquet数据集 (目录下若干 part 文件) 保存, 低基数文本列用字典编码 (category),
+读取时可以只加载需要的列, 并通过内存映射避免整体反序列化
+pandas/pyarrow 在函数内导入, 只取存储路径或指纹时不需要加载它们
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+STORE_PATH = 'df_cleaned.parquet'
+LEGACY_PICKLE_PATH = 'df_cleaned.pkl'
+
+# 存储目录下的派生数据 (以下划线开头, 读取数据集时会被忽略)
+SEEN_IDS_DIR = '_seen_ids'
+AGGREGATES_DIR = '_aggregates'
+# 派生数据目录下的清单: 记录已经计入的part文件, 派生数据和清单一起原子地提交
+MANIFEST_FILE = 'manifest.json'
+
+# 以字典编码保存的列
+CATEGORICAL_COLUMNS = ['publisher_zone', 'state', 'design', 'bg_color']
+
+
+def _encode(df):
+    """把需要字典编码的列转成 category"""
+    import pandas as pd
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _part_files(path):
+    return sorted(glob.glob(os.path.join(path, 'part-*.parquet')))
+
+
+def part_names(path=STORE_PATH):
+    """存储中的part文件名, 按写入顺序"""
+    return [os.path.basename(part) for part in _part_files(path)]
+
+
+def read_manifest(directory):
+    """读取派生数据目录的清单; 还没有清单时返回 None"""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(directory, manifest):
+    """先写临时文件再替换, 中途中断时旧清单仍然完整"""
+    tmp_path = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+
+def _to_table(df, schema=None):
+    """DataFrame转成Arrow表; 全空列 (含全空的 category 列) 按字符串处理, 追加时对齐到已有schema"""
+    import pyarrow as pa
+    table = pa.Table.from_pandas(_encode(df), preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_dictionary(field.type):
+            # 全空的 category 列没有取值, 词典类型按字符串处理
+            value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+            field = field.with_type(pa.dictionary(pa.int32(), value_type))
+        fields.append(field)
+    table = table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+    if schema is not None:
+        columns = []
+        for field in schema:
+            if field.name in table.column_names:
+                columns.append(table[field.name].cast(field.type))
+            else:
+                columns.append(pa.nulls(len(table), type=field.type))
+        table = pa.Table.from_arrays(columns, schema=schema)
+    return table
+
+
+def _write_part(table, path, index):
+    import pyarrow.parquet as pq
+    pq.write_table(table, os.path.join(path, f'part-{index:05d}.parquet'))
+
+
+def clear_store(path=STORE_PATH):
+    """删除存储中已有的part文件和派生数据"""
+    for part in _part_files(path):
+        os.remove(part)
+    for derived in [SEEN_IDS_DIR, AGGREGATES_DIR]:
+        shutil.rmtree(os.path.join(path, derived), ignore_errors=True)
+
+
+def save_cleaned(df, path=STORE_PATH):
+    """覆盖写入清洗后的数据"""
+    os.makedirs(path, exist_ok=True)
+    clear_store(path)
+    _write_part(_to_table(df), path, 0)
+
+
+def append_cleaned(df, path=STORE_PATH):
+    """追加一批清洗后的数据, 写成新的part文件; 列类型对齐到已有数据, 返回新part的文件名"""
+    import pyarrow.parquet as pq
+    os.makedirs(path, exist_ok=True)
+    parts = _part_files(path)
+    schema = pq.read_schema(parts[0]) if parts else None
+    index = int(os.path.basename(parts[-1])[5:10]) + 1 if parts else 0
+    _write_part(_to_table(df, schema=schema), path, index)
+    return f'part-{index:05d}.parquet'
+
+
+def store_exists(path=STORE_PATH):
+    return bool(_part_files(path))
+
+
+def store_columns(path=STORE_PATH):
+    """只读元数据, 返回存储中的列名"""
+    import pyarrow.parquet as pq
+    parts = _part_files(path)
+    if not parts:
+        raise FileNotFoundError(path)
+    return pq.read_schema(parts[0]).names
+
+
+def store_fingerprint(path=STORE_PATH):
+    """
+    存储的指纹: 各数据文件的名称/大小/修改时间, 不读取数据
+    写入、追加或重建存储都会改变指纹
+    """
+    files = _part_files(path)
+    if not files and os.path.exists(LEGACY_PICKLE_PATH):
+        files = [LEGACY_PICKLE_PATH]
+    if not files:
+        raise FileNotFoundError(path)
+    digest = hashlib.sha1()
+    for file_path in files:
+        stat = os.stat(file_path)
+        digest.update(f'{os.path.basename(file_path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_parts(names, columns=None, path=STORE_PATH):
+    """只读取指定的part文件 (派生数据补上清单里缺少的part时使用); 不重新计算 day_index"""
+    import pyarrow.parquet as pq
+    if columns is not None:
+        available = store_columns(path)
+        columns = [col for col in columns if col in available]
+    files = [os.path.join(path, name) for name in names]
+    return pq.read_table(files, columns=columns, memory_map=True).to_pandas()
+
+
+def load_cleaned(columns=None, path=STORE_PATH):
+    """
+    读取清洗后的数据
+    columns为None时读取全部列; 否则只读取存储中存在的那部分列
+    存储不存在时回退到旧的 df_cleaned.pkl
+    """
+    from lead_quality.cleaning import DATE_COL
+    if _part_files(path):
+        import pyarrow.parquet as pq
+        available = store_columns(path)
+        read_columns = None
+        if columns is not None:
+            columns = [col for col in columns if col in available]
+            read_columns = list(columns)
+
+        # day_index相对全量最早时间, 追加数据后会变, 读取时按当前存储重新计算
+        rebase = 'day_index' in (available if columns is None else columns) and DATE_COL in available
+        if rebase and read_columns is not None and DATE_COL not in read_columns:
+            read_columns.append(DATE_COL)
+
+        df = pq.read_table(path, columns=read_columns, memory_map=True).to_pandas()
+        if rebase:
+            df['day_index'] = (df[DATE_COL] - df[DATE_COL].min()).dt.days
+        if columns is not None:
+            df = df[columns]
+        return df
+
+    if os.path.exists(LEGACY_PICKLE_PATH):
+        import pandas as pd
+        df = pd.read_pickle(LEGACY_PICKLE_PATH)
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df
+
+    raise FileNotFoundError(path)
@@ -0,0 +1,268 @@
+"""
+合成lead导出数据
+列与原始导出文件一致 (01_load_and_clean.ipynb 按位置取的列也在同样的位置): VendorLeadID (GUID和22位短ID,
+带少量重复), CallStatus 原始取值, WidgetName 命名模式, 带缺失的 AddressScore/PhoneScore, 广告位/活动/州/债务;
+是否为good lead 由各字段的log-odds效应加时间趋势决定, 分群、趋势和情景分析都能找到信号.
+按块生成, 每块只依赖 (seed, 起始行号), 1万到5000万行都可以直接流式写入 csv / parquet
+
+用法:
+    python -m lead_quality.synthetic 1000000 -o synthetic_leads.csv
+    python -m lead_quality.ingest synthetic_leads.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.cleaning import (ADDRESS_SCORE_COL, ADVERTISER_CAMPAIGN_COL, CALL_STATUS_COL, CAMPAIGN_COL,
+                                   DATE_COL, DEBT_COL, PHONE_SCORE_COL, PUBLISHER_CAMPAIGN_COL,
+                                   PUBLISHER_ZONE_COL, STATE_COL, VENDOR_ID_COL, WIDGET_COL)
+
+DEFAULT_CHUNKSIZE = 1_000_000
+DEFAULT_START = '2009-04-02'
+DEFAULT_END = '2009-09-30'
+
+# 导出文件的列顺序
+COLUMNS = [DATE_COL, 'FirstName', 'Email', VENDOR_ID_COL, CALL_STATUS_COL, WIDGET_COL, PUBLISHER_ZONE_COL,
+           PUBLISHER_CAMPAIGN_COL, ADDRESS_SCORE_COL, PHONE_SCORE_COL, ADVERTISER_CAMPAIGN_COL, STATE_COL,
+           DEBT_COL, CAMPAIGN_COL]
+
+# 广告位: (PublisherZoneName, PublisherCampaignName, 占比, log-odds效应, 可用的WidgetName)
+ZONES = [
+    ('TopLeft-302252', 'DebtReductionInc', 0.92, 0.0, [
+        ('w-302252-DebtReduction1-1DC-CreditSolutions', 0.38, 0.0),
+        ('w-302252-DebtReduction1-1DC-white', 0.16, 0.0),
+        ('w-302252-DebtReduction1-1DC', 0.10, -0.1),
+        ('w-302252-DebtReduction1-1DC-yellowarrow-blue', 0.09, 0.3),
+        ('w-302252-DebtReduction1-1DC-yellowarrow-dark', 0.05, 0.0),
+        ('w-302252-DebtReduction1-1DC-yellowarrow', 0.02, 1.2),
+        ('w-300250-DebtReduction1-1DC', 0.06, -0.5),
+        ('w-300250-DebtReduction1-1DC-BlueMeter', 0.03, 0.1),
+        ('w-300250-DebtReduction1-1DC-Head2', 0.03, 0.1),
+        ('w-300250-DebtReduction1-1DC-Head3', 0.03, -0.7),
+        ('w-300250-DebtReduction1-2DC-BlueMeter', 0.03, -0.4),
+        ('w-300250-DebtReduction1-1DC-CreditSolutions', 0.02, 1.0),
+    ]),
+    ('Top Right-300x250', 'DebtReductionCallCenter', 0.08, -0.7, [
+        ('w-300250-DebtReduction1-1DC', 0.45, 0.0),
+        ('w-300250-DebtReduction1-2DC-CreditSolutions', 0.30, 0.0),
+        ('w-300250-DebtReduction1-2DC-BlueMeter', 0.20, 0.0),
+        ('w-300250-DebtReduction1-1DC-white', 0.05, -0.5),
+    ]),
+]
+
+# 分数: 缺失率, 1..5 各取值占比, 1..5 各取值的效应 (缺失为0)
+ADDRESS_SCORE = (0.61, [0.10, 0.03, 0.08, 0.04, 0.75], [0.0, 0.1, 0.2, -0.2, 0.35])
+PHONE_SCORE = (0.53, [0.01, 0.12, 0.31, 0.14, 0.42], [-1.0, 0.0, 0.1, -0.1, 0.55])
+
+# AdvertiserCampaignName: (取值, 占比, 效应)
+ADVERTISERS = [('Debt Settlement1 Master', 0.6, 0.0), ('creditsolutions-branded-shortform', 0.4, 0.1)]
+
+# MarketingCampaign (None 为缺失), 含 content 的为 content 流量
+MARKETING_CAMPAIGNS = [
+    ('DebtReductionInc', 0.45, 0.0), ('Debt General', 0.10, 0.0), ('Debt Holding Tank', 0.10, -0.1),
+    (None, 0.08, 0.0), ('Financial Services', 0.05, 0.0), ('Debt Volume', 0.04, 0.0), ('Credit', 0.03, 0.1),
+    ('state', 0.03, 0.0), ('Debt Consolidation', 0.01, 0.0), ('Debt Content Network', 0.08, -0.4),
+    ('Credit Content Network', 0.03, -0.4),
+]
+
+STATES = {
+    'CA': 418, 'TX': 298, 'NY': 269, 'FL': 239, 'IL': 177, 'MI': 133, 'VA': 133, 'CO': 97, 'MD': 93, 'AZ': 88,
+    'AL': 85, 'MO': 84, 'LA': 74, 'PA': 69, 'MA': 59, 'OR': 52, 'NV': 51, 'WV': 49, 'AR': 47, 'OK': 43,
+    'IN': 36, 'HI': 28, 'WA': 26, 'NM': 25, 'MT': 22, 'CT': 21, 'NE': 19, 'IA': 18, 'SD': 11, 'ND': 9,
+    'AK': 7, 'DC': 6,
+}
+
+# DebtLevel: (取值, 占比, 效应)
+DEBT_LEVELS = [
+    ('7500-10000', 0.15, -0.3), ('7500-15000', 0.09, -0.2), ('10001-15000', 0.10, -0.1),
+    ('15001-20000', 0.13, 0.0), ('20001-30000', 0.15, 0.1), ('30001-50000', 0.16, 0.2),
+    ('50001-70000', 0.08, 0.2), ('70001-90000', 0.04, 0.1), ('90000-100000', 0.03, 0.0),
+    ('More_than_100000', 0.07, -0.1),
+]
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Linda', 'Michael', 'Barbara', 'William',
+               'Elizabeth', 'David', 'Jennifer', 'Richard', 'Maria', 'Charles', 'Susan', 'Joseph', 'Lisa']
+
+# good lead 的 CallStatus 和占比; 其余leads多数没有CallStatus, 有的是bad取值
+GOOD_STATUSES = [('Closed', 0.62), ('EP Confirmed', 0.33), ('EP Sent', 0.04), ('EP Received', 0.01)]
+OTHER_STATUSES = [(None, 0.81), ("Contacted - Doesn't Qualify", 0.08),
+                  ('Unable to contact - Bad Contact Information', 0.075), ('Contacted - Invalid Profile', 0.035)]
+
+# good lead 的基准 log-odds (约5.5%), 以及整个时间范围内的线性变化
+BASE_LOGIT = -3.05
+TREND_LOGIT = 0.45
+
+DUPLICATE_RATE = 0.01
+
+
+def _choice(rng, table, size):
+    """按占比抽样, 返回 (编码, 取值数组, 效应数组)"""
+    values = np.array([row[0] for row in table], dtype=object)
+    weights = np.array([row[1] for row in table], dtype=np.float64)
+    effects = np.array([row[2] if len(row) > 2 else 0.0 for row in table], dtype=np.float64)
+    codes = rng.choice(len(values), size=size, p=weights / weights.sum())
+    return codes, values, effects
+
+
+def _scores(rng, spec, size):
+    missing_rate, weights, effects = spec
+    scores = rng.choice(np.arange(1, 6, dtype=np.float64), size=size, p=np.asarray(weights) / sum(weights))
+    effect = np.asarray(effects)[scores.astype(np.int64) - 1]
+    missing = rng.random(size) < missing_rate
+    scores[missing] = np.nan
+    effect[missing] = 0.0
+    return scores, effect
+
+
+def _guid_ids(rng, size):
+    """大写十六进制GUID, 8-4-4-4-12"""
+    digits = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)[rng.integers(0, 16, (size, 32))]
+    chars = np.full((size, 36), ord('-'), dtype=np.uint8)
+    chars[:, [i for i in range(36) if i not in (8, 13, 18, 23)]] = digits
+    return chars.view('S36').ravel().astype(str)
+
+
+def _short_ids(rng, size):
+    """22位 url-safe base64 短ID"""
+    alphabet = np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_', dtype=np.uint8)
+    chars = np.ascontiguousarray(alphabet[rng.integers(0, 64, (size, 22))])
+    return chars.view('S22').ravel().astype(str)
+
+
+def generate_chunk(n_rows, offset=0, total_rows=None, seed=0, start=DEFAULT_START, end=DEFAULT_END,
+                   duplicate_rate=DUPLICATE_RATE):
+    """
+    共 total_rows 行中从第 offset 行开始的 n_rows 行: 时间落在整个范围中按行号对应的一段, 块内按时间排序,
+    各块依次拼接就是按时间排序的完整导出; 重复的VendorLeadID只出现在块内
+    """
+    total_rows = n_rows if total_rows is None else total_rows
+    rng = np.random.default_rng([seed, offset])
+    start, end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    span = (end - start).value
+
+    # 本块覆盖整个时间范围的 [lo, hi) 比例
+    lo, hi = offset / total_rows, (offset + n_rows) / total_rows
+    position = np.sort(lo + (hi - lo) * rng.random(n_rows))
+    created = start.value + (position * span).astype(np.int64)
+
+    zone_codes = rng.choice(len(ZONES), size=n_rows, p=[zone[2] for zone in ZONES])
+    widgets = np.empty(n_rows, dtype=object)
+    logit = BASE_LOGIT + TREND_LOGIT * (position - 0.5)
+    for z, (_, _, _, zone_effect, widget_table) in enumerate(ZONES):
+        rows = np.flatnonzero(zone_codes == z)
+        codes, values, effects = _choice(rng, widget_table, len(rows))
+        widgets[rows] = values[codes]
+        logit[rows] += zone_effect + effects[codes]
+
+    address, address_effect = _scores(rng, ADDRESS_SCORE, n_rows)
+    phone, phone_effect = _scores(rng, PHONE_SCORE, n_rows)
+    logit += address_effect + phone_effect
+
+    columns = {}
+    for col, table in [(ADVERTISER_CAMPAIGN_COL, ADVERTISERS), (DEBT_COL, DEBT_LEVELS),
+                       (CAMPAIGN_COL, MARKETING_CAMPAIGNS)]:
+        codes, values, effects = _choice(rng, table, n_rows)
+        columns[col] = values[codes]
+        logit += effects[codes]
+    states, state_values, _ = _choice(rng, list(STATES.items()), n_rows)
+
+    is_good = rng.random(n_rows) < 1 / (1 + np.exp(-logit))
+    status = np.empty(n_rows, dtype=object)
+    for mask, table in [(is_good, GOOD_STATUSES), (~is_good, OTHER_STATUSES)]:
+        codes, values, _ = _choice(rng, table, int(mask.sum()))
+        status[mask] = values[codes]
+
+    # 一半GUID, 一半短ID; 少量行重复之前某行的ID
+    guid = rng.random(n_rows) < 0.5
+    ids = np.empty(n_rows, dtype=object)
+    ids[guid] = _guid_ids(rng, int(guid.sum()))
+    ids[~guid] = _short_ids(rng, n_rows - int(guid.sum()))
+    duplicates = np.flatnonzero(rng.random(n_rows) < duplicate_rate)
+    duplicates = duplicates[duplicates > 0]
+    ids[duplicates] = ids[rng.integers(0, duplicates)]
+
+    names = np.array(FIRST_NAMES, dtype=object)
+    name_codes = rng.integers(0, len(names), n_rows)
+    emails = np.array([f'{name.lower()}@example.com' for name in FIRST_NAMES], dtype=object)
+
+    df = pd.DataFrame({
+        DATE_COL: pd.to_datetime(created).floor('s'),
+        'FirstName': names[name_codes],
+        'Email': emails[name_codes],
+        VENDOR_ID_COL: ids,
+        CALL_STATUS_COL: status,
+        WIDGET_COL: widgets,
+        PUBLISHER_ZONE_COL: np.array([zone[0] for zone in ZONES], dtype=object)[zone_codes],
+        PUBLISHER_CAMPAIGN_COL: np.array([zone[1] for zone in ZONES], dtype=object)[zone_codes],
+        ADDRESS_SCORE_COL: address,
+        PHONE_SCORE_COL: phone,
+        ADVERTISER_CAMPAIGN_COL: columns[ADVERTISER_CAMPAIGN_COL],
+        STATE_COL: state_values[states],
+        DEBT_COL: columns[DEBT_COL],
+        CAMPAIGN_COL: columns[CAMPAIGN_COL],
+    })
+    return df[COLUMNS]
+
+
+def iter_leads(n_rows, chunksize=DEFAULT_CHUNKSIZE, seed=0, start=DEFAULT_START, end=DEFAULT_END,
+               duplicate_rate=DUPLICATE_RATE):
+    """按块产出共 n_rows 行的合成导出数据; 结果只取决于 (n_rows, chunksize, seed)"""
+    for offset in range(0, n_rows, chunksize):
+        yield generate_chunk(min(chunksize, n_rows - offset), offset, n_rows, seed=seed, start=start, end=end,
+                             duplicate_rate=duplicate_rate)
+
+
+def generate_leads(n_rows, seed=0, chunksize=DEFAULT_CHUNKSIZE, **kwargs):
+    """一次生成完整的合成数据 (放得进内存的规模)"""
+    return pd.concat(iter_leads(n_rows, chunksize=chunksize, seed=seed, **kwargs), ignore_index=True)
+
+
+def write_leads(path, n_rows, chunksize=DEFAULT_CHUNKSIZE, seed=0, **kwargs):
+    """流式写入 csv 或 parquet, 峰值内存只和块大小有关; 返回写入的行数"""
+    written = 0
+    if path.lower().endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in iter_leads(n_rows, chunksize=chunksize, seed=seed, **kwargs):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif path.lower().endswith('.csv'):
+        for chunk in iter_leads(n_rows, chunksize=chunksize, seed=seed, **kwargs):
+            chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+            written += len(chunk)
+    else:
+        raise ValueError(f"不支持的文件格式: {path}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成lead导出数据')
+    parser.add_argument('rows', type=int, help='行数')
+    parser.add_argument('-o', '--output', default='synthetic_leads.csv', help='输出文件 .csv / .parquet')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='每块行数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认 0)')
+    parser.add_argument('--start', default=DEFAULT_START, help=f'最早日期 (默认 {DEFAULT_START})')
+    parser.add_argument('--end', default=DEFAULT_END, help=f'最晚日期 (默认 {DEFAULT_END})')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = write_leads(args.output, args.rows, chunksize=args.chunksize, seed=args.seed,
+                          start=args.start, end=args.end)
+    print(f"已生成 {written:,} 行 -> {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB, "
+          f"{time.perf_counter() - start:.1f} 秒)")
+
+
+if __name__ == '__main__':
+    main()
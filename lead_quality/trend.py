@@ -0,0 +1,154 @@
+"""
+趋势检验
+is_good 只随日期变化, 所有检验都在按天汇总的 (good, total) 上做, 代价只和天数有关:
+带截距的二项GLM (与以日历天数为自变量的逐行Logit估计相同)、Cochran-Armitage趋势检验、单变点检验
+输入可以是一维 (一个序列) 或二维 (每行一个序列, 如各分群), 按最后一维的天数向量化计算
+"""
+
+import numpy as np
+import pandas as pd
+
+from lead_quality.hypothesis import two_proportion_ztest, two_sided_p
+
+
+def daily_counts(df, date_col='date'):
+    """按天汇总 good/total, day为相对最早一天的天数"""
+    dates = pd.to_datetime(df[date_col])
+    counts = df.groupby(dates)['is_good'].agg(good='sum', total='count').reset_index()
+    counts = counts.rename(columns={date_col: 'date'})
+    counts['day'] = (counts['date'] - counts['date'].min()).dt.days
+    return counts[['date', 'day', 'good', 'total']]
+
+
+def binomial_trend(day, good, total, max_iter=50, tol=1e-10):
+    """
+    二项GLM (logit链接): logit(rate) = intercept + slope * day
+    按天汇总后用IRLS求解, 与逐行 Logit(is_good ~ 1 + day) 的估计和标准误一致, 其中 day 是日历日期
+    相对最早一天的天数; 存储中的 day_index 按时间戳相对最早一条lead计算, 多数行与它差一天,
+    以 day_index 为自变量的逐行Logit结果会略有不同 (样例数据: 斜率 0.00296, p = 0.071;
+    这里为 0.00308, p = 0.061)
+    返回 intercept / slope / slope_se / z_stat / p_value (二维输入时每项是数组)
+    """
+    good = np.asarray(good, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    day = np.broadcast_to(np.asarray(day, dtype=np.float64), good.shape)
+
+    # 以加权平均天数为中心, 数值更稳定; 最后再换回 day=0 处的截距
+    n_all = total.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center = (total * day).sum(axis=-1) / n_all
+        x = day - center[..., None]
+        rate = np.clip(good.sum(axis=-1) / n_all, 1e-6, 1 - 1e-6)
+    b0 = np.log(rate / (1 - rate))
+    b1 = np.zeros_like(b0)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(max_iter):
+            eta = b0[..., None] + b1[..., None] * x
+            mu = 1 / (1 + np.exp(-eta))
+            w = total * mu * (1 - mu)
+            # 工作响应: eta + (y - n*mu) / w
+            z = eta + np.where(w > 0, (good - total * mu) / w, 0.0)
+            s0, s1, s2 = w.sum(axis=-1), (w * x).sum(axis=-1), (w * x * x).sum(axis=-1)
+            t0, t1 = (w * z).sum(axis=-1), (w * x * z).sum(axis=-1)
+            det = s0 * s2 - s1 * s1
+            new_b0 = (s2 * t0 - s1 * t1) / det
+            new_b1 = (s0 * t1 - s1 * t0) / det
+            step = np.maximum(np.abs(new_b0 - b0), np.abs(new_b1 - b1))
+            b0, b1 = new_b0, new_b1
+            # 发散 (如全0/全1序列) 的行为NaN, 不参与收敛判断
+            if not np.any(step > tol):
+                break
+
+        eta = b0[..., None] + b1[..., None] * x
+        mu = 1 / (1 + np.exp(-eta))
+        w = total * mu * (1 - mu)
+        s0, s1, s2 = w.sum(axis=-1), (w * x).sum(axis=-1), (w * x * x).sum(axis=-1)
+        slope_se = np.sqrt(s0 / (s0 * s2 - s1 * s1))
+        z_stat = b1 / slope_se
+
+    return {
+        'intercept': b0 - b1 * center,
+        'slope': b1,
+        'slope_se': slope_se,
+        'z_stat': z_stat,
+        'p_value': two_sided_p(z_stat),
+    }
+
+
+def cochran_armitage(good, total, scores=None):
+    """
+    Cochran-Armitage趋势检验: 各天比率是否随 scores (默认 0..K-1) 线性变化
+    返回 z_stat / p_value
+    """
+    good = np.asarray(good, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    if scores is None:
+        scores = np.arange(good.shape[-1], dtype=np.float64)
+    scores = np.broadcast_to(np.asarray(scores, dtype=np.float64), good.shape)
+
+    n_all = total.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_bar = good.sum(axis=-1) / n_all
+        statistic = (scores * (good - total * p_bar[..., None])).sum(axis=-1)
+        variance = p_bar * (1 - p_bar) * ((total * scores ** 2).sum(axis=-1)
+                                          - (total * scores).sum(axis=-1) ** 2 / n_all)
+        z_stat = statistic / np.sqrt(variance)
+    return {'z_stat': z_stat, 'p_value': two_sided_p(z_stat)}
+
+
+def change_point(good, total):
+    """
+    单变点检验: 对每个切分位置 (前k天 vs 之后) 做双比例z检验, 取 |z| 最大的切分
+    用前缀和一次算出所有切分; p_value 按切分个数做Bonferroni校正 (偏保守)
+    返回 split (之后一段的第一天的位置) / rate_before / rate_after / z_stat / p_value
+    """
+    good = np.asarray(good, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    n_days = good.shape[-1]
+
+    good_before = np.cumsum(good, axis=-1)[..., :-1]
+    total_before = np.cumsum(total, axis=-1)[..., :-1]
+    good_after = good.sum(axis=-1)[..., None] - good_before
+    total_after = total.sum(axis=-1)[..., None] - total_before
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_before = good_before / total_before
+        rate_after = good_after / total_after
+    z, _ = two_proportion_ztest(good_before, total_before, good_after, total_after)
+    z = np.where(np.isfinite(z), z, 0.0)
+
+    best = np.argmax(np.abs(z), axis=-1)
+
+    def pick(values):
+        return np.take_along_axis(values, best[..., None], axis=-1)[..., 0]
+
+    z_best = pick(z)
+    return {
+        'split': best + 1,
+        'rate_before': pick(rate_before),
+        'rate_after': pick(rate_after),
+        'z_stat': z_best,
+        'p_value': np.minimum(1.0, two_sided_p(z_best) * max(n_days - 1, 1)),
+    }
+
+
+def trend_summary(counts):
+    """daily_counts 结果上的三个检验, 返回一个dict (change_point_date 为 YYYY-MM-DD 字符串)"""
+    day = counts['day'].to_numpy()
+    good = counts['good'].to_numpy()
+    total = counts['total'].to_numpy()
+    glm = binomial_trend(day, good, total)
+    armitage = cochran_armitage(good, total, scores=day)
+    split = change_point(good, total)
+    return {
+        'slope': float(glm['slope']),
+        'slope_se': float(glm['slope_se']),
+        'intercept': float(glm['intercept']),
+        'p_value_glm': float(glm['p_value']),
+        'p_value_cochran_armitage': float(armitage['p_value']),
+        # ISO日期字符串: 缓存的趋势结果里不含pandas对象, 读取时不需要导入pandas
+        'change_point_date': str(counts['date'].iloc[int(split['split'])].date()),
+        'change_point_rate_before': float(split['rate_before']),
+        'change_point_rate_after': float(split['rate_after']),
+        'p_value_change_point': float(split['p_value']),
+    }
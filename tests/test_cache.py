@@ -0,0 +1,20 @@
+from lead_quality.cache import ResultCache
+
+
+def test_oversized_value_is_skipped_without_evicting(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=10_000)
+    cache.put('small', list(range(100)))
+    assert cache.put('large', b'x' * 20_000) is False
+
+    assert cache.get('large') is None
+    assert cache.get('small') == list(range(100))
+    assert len(cache.entries()) == 1
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=2_500)
+    for name in ['a', 'b', 'c']:
+        cache.put(name, b'x' * 1_000)
+    assert cache.get('a') is None
+    assert cache.get('c') == b'x' * 1_000
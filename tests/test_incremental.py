@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from lead_quality import pipeline
+from lead_quality.incremental import current_aggregates, ingest_delta, load_aggregates
+from lead_quality.ingest import ingest
+from lead_quality.store import load_cleaned
+from lead_quality.synthetic import generate_leads
+
+
+def test_append_then_incremental_keeps_aggregates_complete(tmp_path):
+    store = str(tmp_path / 'store.parquet')
+    leads = generate_leads(3000, seed=1, duplicate_rate=0)
+    d1, d2, d3 = leads.iloc[:1000], leads.iloc[1000:2000], leads.iloc[2000:]
+
+    ingest_delta(d1, store_path=store)
+    ingest(d2, store_path=store, overwrite=False)
+    assert current_aggregates('daily', store_path=store) is None
+    ingest_delta(d3, store_path=store)
+
+    stored = load_cleaned(columns=['date'], path=store)
+    daily = load_aggregates('daily', store_path=store)
+    assert daily['total_count'].sum() == len(stored)
+    assert set(daily['date']) == set(stored['date'])
+
+
+def test_interrupted_ingest_resumes_without_duplicates(tmp_path):
+    store = str(tmp_path / 'store.parquet')
+    leads = generate_leads(3000, seed=2, duplicate_rate=0)
+    ingest_delta(leads.iloc[:1000], store_path=store)
+
+    def crash(cleaned, part):
+        raise KeyboardInterrupt
+
+    # 第一块写入part后、提交ID集合和汇总表前中断
+    with pytest.raises(KeyboardInterrupt):
+        ingest(leads.iloc[1000:], store_path=store, chunksize=500, overwrite=False, on_chunk=crash)
+    summary = ingest_delta(leads.iloc[1000:], store_path=store, chunksize=500)
+
+    stored = load_cleaned(columns=['VendorLeadID'], path=store)
+    assert summary['duplicates'] == 500
+    assert len(stored) == len(leads) and stored['VendorLeadID'].is_unique
+    assert current_aggregates('daily', store_path=store)['total_count'].sum() == len(leads)
+
+
+def test_pipeline_reads_aggregates_like_full_store(tmp_path):
+    store = str(tmp_path / 'store.parquet')
+    leads = generate_leads(3000, seed=3, duplicate_rate=0)
+    ingest_delta(leads, store_path=store, chunksize=700)
+
+    pipeline.clear_memo()
+    from_aggregates = pipeline.Pipeline.load(store)
+    full_scan = pipeline.Pipeline(load_cleaned(columns=pipeline.pipeline_columns(), path=store))
+    for name in ['daily_stats', 'weekly_stats', 'segment_table']:
+        pd.testing.assert_frame_equal(from_aggregates[name], full_scan[name])
+    assert from_aggregates['baseline'] == full_scan['baseline']
+    assert not from_aggregates.loaded
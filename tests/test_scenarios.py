@@ -0,0 +1,12 @@
+import pandas as pd
+
+from lead_quality.scenarios import optimize_reallocation
+
+
+def test_unreachable_reallocation_keeps_budget():
+    segments = pd.DataFrame({'leads': [100, 100, 100], 'good_count': [20, 10, 5]})
+    mix, summary = optimize_reallocation(segments, target_rate=0.5, max_increase=0.3, max_cut=0.3, budget=300)
+
+    assert not summary['reached_target']
+    assert summary['total_volume'] == 300
+    assert list(mix['new_leads']) == [130, 100, 70]